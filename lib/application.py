@@ -1,21 +1,21 @@
 """Business-logic of Lib"""
 
-import os
-
 # pifou library
 import pifou.lib
 
+# pifou dependencies
+from PyQt5 import QtCore
+
 # local library
 import lib.model
+import lib.dispatch
+import lib.resolver
 import lib.settings
 import lib.controller
 
-# pifou dependency
-import zmq
-
 
 @pifou.lib.log
-class Lib(object):
+class Lib(QtCore.QObject):
     """Lib Application
 
     Arguments:
@@ -25,31 +25,47 @@ class Lib(object):
     Attributes:
         controller: Associated controller to this application
         model: Associated model to this application
-        outsocket: Reference to socket used to transmit messages
+        outsocket: Queue of messages transmitted from a background
+            thread, see :class:`lib.dispatch.Dispatcher`
+        resolver: Discovers, and caches, the file of each version
+
+    Signals:
+        resolved (tuple): Path, file and error of a version, resolved
+            in the background; see :meth:`import_versions`
 
     """
 
+    resolved = QtCore.pyqtSignal(object)
+
     def __init__(self, outport=None, support=tuple()):
+        super(Lib, self).__init__()
+
         self.controller = None
         self.model = None
         self.outport = outport
         self.support = support
         self.outsocket = None
+        self.resolver = lib.resolver.Resolver(support)
 
         if outport:
             self.log.info("Establishing connection to {}".format(outport))
-            context = zmq.Context.instance()
-            self.outsocket = context.socket(zmq.PUSH)
-            self.outsocket.connect("tcp://127.0.0.1:{}".format(outport))
+            self.outsocket = lib.dispatch.Dispatcher(
+                "tcp://127.0.0.1:{}".format(outport),
+                maxsize=lib.settings.OUTBOX_SIZE,
+                hwm=lib.settings.OUTBOX_HWM,
+                policy=lib.settings.OUTBOX_POLICY)
         else:
             self.log.warning("Offline..")
 
+        self.resolved.connect(self.on_resolved, QtCore.Qt.QueuedConnection)
+
     def set_model(self, model):
         self.model = model
 
     def set_controller(self, controller):
         self.controller = controller
         controller.import_version.connect(self.import_version)
+        controller.import_versions.connect(self.import_versions)
         controller.import_file.connect(self.import_file)
 
     def import_version(self, path):
@@ -60,38 +76,46 @@ class Lib(object):
 
         """
 
+        self.import_versions([path])
+
+    def import_versions(self, paths):
+        """Import domain-versions at `paths`
+
+        The supported file of each version is resolved in parallel,
+        in the background, and cached for subsequent imports of the
+        same version; each is imported as it is resolved, see
+        :meth:`on_resolved`.
+
+        Arguments:
+            paths (list): Absolute paths to domain objects
+
+        """
+
         if not self.outsocket:
             info = "No receiver found"
             self.error(info)
             return self.controller.notify(info)
 
-        info = "Importing domain version: {}".format(path)
-        self.info(info)
-
-        supported_ext = self.support
-        supported_files = list()
+        for path in paths:
+            info = "Importing domain version: {}".format(path)
+            self.info(info)
 
-        if not os.path.isdir(path):
-            return self.error('{} is not a directory'.format(path))
+        self.log.info("Looking for supported files in domain-versions:"
+                      "%r" % (self.resolver.support,))
 
-        self.log.info("Looking for supported files in domain-version:"
-                      "%r" % supported_ext)
+        for future in self.resolver.resolve_async(paths):
+            future.add_done_callback(
+                lambda future: self.resolved.emit(future.result()))
 
-        for _, _, files in os.walk(path):
-            for f in files:
-                name, ext = os.path.splitext(f)
-                if ext.lower() in supported_ext:
-                    supported_files.append(f)
-            break
+    def on_resolved(self, result):
+        path, file, error = result
 
-        if not len(supported_files) == 1:
-            info = "No supported files found"
-            self.log.error(info)
-            return self.error(info)
+        if error is not None:
+            self.error(str(error))
+            return
 
-        path = os.path.join(path, files[0])
-        self.info("About to import {}".format(path))
-        self.import_file(path)
+        self.info("About to import {}".format(file))
+        self.import_file(file)
 
     def import_file(self, path):
         """Import `path`
@@ -0,0 +1,323 @@
+"""Benchmarks of pulling, delegate creation and command throughput
+
+Workloads are run against synthetic directories, generated in a
+temporary location, of each requested number of entries; every
+tenth entry is an asset folder of versions, the remainder files.
+
+Results are written as JSON, for comparison across releases.
+
+Pulls are measured in a fresh process each, such that memory freed
+by one measurement is not re-used by the next, and that the cost of
+importing the model is not included.
+
+Usage:
+    From a command shell
+
+    $ python -m lib.benchmark
+    $ python -m lib.benchmark --entries 10 1000 100000
+    $ python -m lib.benchmark --output 0.1.0.json
+    $ python -m lib.benchmark --skip commands
+    $ python -m lib.benchmark --router
+
+"""
+
+# standard library
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import subprocess
+import tempfile
+import threading
+
+# local library
+import lib.version
+
+ENTRIES = (10, 100, 1000, 10000, 100000)
+VERSIONS = 3
+
+
+def generate(root, entries):
+    """Populate `root` with `entries` files and versioned folders"""
+    for number in range(entries):
+        if number % 10 == 0:
+            asset = os.path.join(root, 'asset%06i' % number)
+            for version in range(1, VERSIONS + 1):
+                path = os.path.join(asset, 'v%03i' % version)
+                os.makedirs(path)
+                open(os.path.join(path, 'asset.ma'), 'w').close()
+        else:
+            open(os.path.join(root, 'file%06i.ma' % number), 'w').close()
+
+
+def resident():
+    """Return resident memory of this process, in bytes"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (IOError, OSError):
+        import resource
+        usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return usage * (1 if sys.platform == 'darwin' else 1024)
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def application():
+    """Return Qt application, without a display"""
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+    from PyQt5 import QtWidgets
+    return (QtWidgets.QApplication.instance() or
+            QtWidgets.QApplication(sys.argv))
+
+
+def bench_pull(root, entries, compact=False):
+    """Time pulling a column of `entries`, and measure memory per item
+
+    Memory is only representative of a fresh process,
+    see :func:`bench_pull_process`.
+
+    """
+
+    import gc
+    import lib.model
+
+    model = lib.model.Model(compact=compact)
+    model.setup(root)
+    index = model.root_item.index
+
+    gc.collect()
+    before = resident()
+
+    started = time.time()
+    model.pull(index)
+    duration = time.time() - started
+
+    gc.collect()
+    items = len(model.indexes)
+
+    return model, {'benchmark': 'pull',
+                   'compact': compact,
+                   'entries': entries,
+                   'items': items,
+                   'seconds': duration,
+                   'bytes_per_item': (resident() - before) / float(items)}
+
+
+def bench_pull_process(root, entries, compact=False):
+    """Run :func:`bench_pull` in a fresh process, and return its result"""
+    package = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(
+        filter(None, [package, env.get('PYTHONPATH')]))
+
+    command = [sys.executable, '-m', 'lib.benchmark',
+               '--pull', root, '--entries', str(entries)]
+    if compact:
+        command.append('--compact')
+
+    return json.loads(subprocess.check_output(command, env=env))
+
+
+def bench_delegates(model, entries):
+    """Time representing the root column, eagerly and virtualised"""
+    import lib.view
+
+    app = application()
+    index = model.root_item.index
+    children = model.children(index)
+
+    started = time.time()
+    delegates = list()
+    for child in children:
+        cls, label = lib.view.delegate_spec(model, child)
+        delegates.append(cls(label, child))
+    eager = time.time() - started
+
+    for delegate in delegates:
+        delegate.deleteLater()
+    app.processEvents()
+
+    column = lib.view.VirtualList()
+    column.resize(300, 600)
+    column.set_model(model)
+
+    started = time.time()
+    column.set_index(index)
+    virtual = time.time() - started
+
+    started = time.time()
+    scrollbar = column.verticalScrollBar()
+    for value in range(0, scrollbar.maximum(), column.row_height * 10):
+        scrollbar.setValue(value)
+    scrolled = time.time() - started
+
+    column.deleteLater()
+    app.processEvents()
+
+    return {'benchmark': 'delegates',
+            'entries': entries,
+            'delegates': len(children),
+            'eager_seconds': eager,
+            'eager_seconds_per_delegate': eager / max(1, len(children)),
+            'virtual_seconds': virtual,
+            'virtual_delegates': len(column.visible),
+            'virtual_scroll_seconds': scrolled}
+
+
+class StubReceiver(object):
+    """Receiver returning immediately"""
+
+    def register(self, endpoint):
+        pass
+
+    def import_file(self, path):
+        return path
+
+    def import_reference(self, path):
+        return path
+
+
+def bench_commands(clients=4, commands=1000, router=False, port=7100):
+    """Measure commands per second, and latency, of a local server
+
+    Each client sends its commands one at a time, and the latency
+    of a command is from sending it to receiving its results.
+
+    """
+
+    import zmq
+    import pifou.com.constant as constant
+    import lib.command
+
+    if router:
+        lib.command.RouterServer(StubReceiver())
+    else:
+        lib.command.Server(StubReceiver())
+
+    context = zmq.Context.instance()
+    latencies = list()
+    lock = threading.Lock()
+
+    def client(address):
+        results = context.socket(zmq.REP)
+        results.bind(address.replace('localhost', '*'))
+
+        init = context.socket(zmq.REQ)
+        init.connect('tcp://localhost:7000')
+        init.send_json({constant.COMMAND: 'connect',
+                        constant.ID: address})
+        init.recv_json()
+
+        requests = context.socket(zmq.REQ)
+        requests.connect('tcp://localhost:7001')
+
+        measured = list()
+        for number in range(commands):
+            started = time.time()
+            requests.send_json({constant.ID: address,
+                                constant.COMMAND: 'import',
+                                constant.ARGS: ['/asset%i.ma' % number]})
+            requests.recv_json()
+
+            results.recv_json()
+            measured.append(time.time() - started)
+            results.send_json({constant.STATUS: constant.OK})
+
+        with lock:
+            latencies.extend(measured)
+
+    threads = list()
+    for number in range(clients):
+        thread = threading.Thread(
+            target=client, args=('tcp://localhost:%i' % (port + number),))
+        threads.append(thread)
+
+    started = time.time()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    duration = time.time() - started
+
+    return {'benchmark': 'commands',
+            'server': 'router' if router else 'default',
+            'clients': clients,
+            'commands': len(latencies),
+            'commands_per_second': len(latencies) / duration,
+            'p50_seconds': percentile(latencies, 0.5),
+            'p99_seconds': percentile(latencies, 0.99)}
+
+
+def run(entries=ENTRIES, skip=(), router=False):
+    """Run benchmarks and return results"""
+    results = list()
+
+    for count in entries:
+        root = tempfile.mkdtemp(prefix='lib-benchmark-')
+
+        try:
+            generate(root, count)
+
+            if 'pull' not in skip:
+                for compact in (False, True):
+                    results.append(bench_pull_process(root, count, compact))
+
+            if 'delegates' not in skip:
+                application()
+
+                model, result = bench_pull(root, count)
+                results.append(bench_delegates(model, count))
+
+                del model
+
+        finally:
+            shutil.rmtree(root)
+
+    if 'commands' not in skip:
+        results.append(bench_commands(router=router))
+
+    return {'version': lib.version.version,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'time': time.time(),
+            'results': results}
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--entries', type=int, nargs='*', default=ENTRIES)
+    parser.add_argument('--skip', nargs='*', default=list(),
+                        choices=('pull', 'delegates', 'commands'))
+    parser.add_argument('--router', action='store_true',
+                        help="Benchmark RouterServer, over Server")
+    parser.add_argument('--output', default=None,
+                        help="Write results to file, over stdout")
+    parser.add_argument('--pull', default=None, metavar='ROOT',
+                        help="Only measure pulling ROOT of --entries, "
+                             "as run per process by bench_pull_process")
+    parser.add_argument('--compact', action='store_true')
+
+    args = parser.parse_args()
+
+    if args.pull:
+        model, result = bench_pull(args.pull, args.entries[0], args.compact)
+        print json.dumps(result)
+        sys.exit(0)
+
+    report = run(args.entries, args.skip, args.router)
+    output = json.dumps(report, indent=4, sort_keys=True)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+    else:
+        print output
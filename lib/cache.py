@@ -0,0 +1,189 @@
+"""Persistent directory listing cache
+
+Listings are stored per directory, along with the mtime of the
+directory at the time of listing. A listing is valid for as long
+as the mtime of its directory remains unchanged; i.e. no entries
+have been added, removed or renamed.
+
+ _____________________________________________
+|                                             |
+| directory | mtime | accessed | size | data  |
+|-----------|-------|----------|------|-------|
+| /jobs     | 13.0  | 20.5     | 312  | [...] |
+|_____________________________________________|
+
+Once the total size of stored listings exceeds its cap, the
+least recently accessed listings are evicted. Access times are
+kept in memory, and written along with the next listing stored,
+or upon :meth:`Cache.flush`, such that reading never writes.
+
+Note:
+    The size and mtime of cached children are those at the time
+    of listing; modifying the contents of a file does not alter
+    the mtime of its directory.
+
+"""
+
+# standard library
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+
+log = logging.getLogger('lib.cache')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS listing (
+    directory TEXT PRIMARY KEY,
+    mtime REAL NOT NULL,
+    accessed REAL NOT NULL,
+    size INTEGER NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS listing_accessed ON listing (accessed);
+"""
+
+
+class Cache(object):
+    """Directory listings stored in SQLite
+
+    Arguments:
+        path (str): Absolute path to database, created if missing
+        max_size (int): Maximum total size, in bytes, of listings
+
+    """
+
+    def __init__(self, path, max_size=64 * 1024 * 1024):
+        dirname = os.path.dirname(path)
+        if dirname and not os.path.exists(dirname):
+            os.makedirs(dirname)
+
+        self.path = path
+        self.max_size = max_size
+
+        # Listings are read from pull worker threads
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.executescript(SCHEMA)
+
+        self.size = self.connection.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM listing").fetchone()[0]
+
+        self.accessed = dict()  # {directory: time}, not yet written
+
+    def get(self, directory):
+        """Return cached listing of `directory`, or None
+
+        None is returned if `directory` has not been cached, or
+        has been modified since.
+
+        """
+
+        try:
+            mtime = os.stat(directory).st_mtime
+        except OSError:
+            return None
+
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT mtime, data FROM listing WHERE directory = ?",
+                (directory,)).fetchone()
+
+            if row is None:
+                return None
+
+            if row[0] != mtime:
+                self._delete(directory)
+                self.connection.commit()
+                return None
+
+            self.accessed[directory] = time.time()
+
+        return json.loads(row[1])
+
+    def put(self, directory, mtime, listing):
+        """Store `listing` of `directory`, as of `mtime`
+
+        Arguments:
+            directory (str): Absolute path to listed directory
+            mtime (float): Modification time of `directory` prior
+                to it being listed
+            listing (list): JSON-serialisable listing
+
+        """
+
+        data = json.dumps(listing, separators=(',', ':'))
+
+        with self.lock:
+            self._delete(directory)
+            self.connection.execute(
+                "INSERT INTO listing VALUES (?, ?, ?, ?, ?)",
+                (directory, mtime, time.time(), len(data), data))
+            self.size += len(data)
+
+            self._write_accessed()
+
+            if self.size > self.max_size:
+                self._evict()
+
+            self.connection.commit()
+
+    def flush(self):
+        """Write access times kept in memory"""
+        with self.lock:
+            if self.accessed:
+                self._write_accessed()
+                self.connection.commit()
+
+    def clear(self):
+        with self.lock:
+            self.connection.execute("DELETE FROM listing")
+            self.connection.commit()
+            self.accessed.clear()
+            self.size = 0
+
+    def close(self):
+        self.flush()
+
+        with self.lock:
+            self.connection.close()
+
+    def _write_accessed(self):
+        self.connection.executemany(
+            "UPDATE listing SET accessed = ? WHERE directory = ?",
+            [(accessed, directory)
+             for directory, accessed in self.accessed.items()])
+        self.accessed.clear()
+
+    def _delete(self, directory):
+        row = self.connection.execute(
+            "SELECT size FROM listing WHERE directory = ?",
+            (directory,)).fetchone()
+
+        if row is not None:
+            self.connection.execute(
+                "DELETE FROM listing WHERE directory = ?", (directory,))
+            self.size -= row[0]
+
+        self.accessed.pop(directory, None)
+
+    def _evict(self):
+        """Remove least recently accessed listings until within cap"""
+        rows = self.connection.execute(
+            "SELECT directory, size FROM listing ORDER BY accessed"
+        ).fetchall()
+
+        evicted = list()
+        for directory, size in rows:
+            if self.size <= self.max_size:
+                break
+
+            evicted.append((directory,))
+            self.size -= size
+
+        self.connection.executemany(
+            "DELETE FROM listing WHERE directory = ?", evicted)
+
+        log.debug("Evicted %i listings" % len(evicted))
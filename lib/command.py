@@ -9,8 +9,11 @@ Who decides which command is associated with which receiver?
 """
 
 # standard library
+import json
+import time
 import logging
 import threading
+import collections
 import Queue as queue
 
 # pifou library
@@ -26,112 +29,511 @@ import zmq
 
 # local library
 import lib
+import lib.stats
 
 log = logging.getLogger()
-if not log.handlers:
-    lib.setup_log()
-
-local_ip = pifou.com.util.local_ip()
 
 # Shorthands
 constant = pifou.com.constant
 endpoint = pifou.com.pyzmq.endpoint
 
+_local_ip = list()  # Resolved upon first use, see local_ip()
+
+
+def local_ip():
+    """Return IP of this machine
+
+    Resolving the IP may take seconds on a misconfigured network,
+    and is therefore deferred until first needed, rather than
+    done upon import.
+
+    """
+
+    if not _local_ip:
+        _local_ip.append(pifou.com.util.local_ip())
+    return _local_ip[0]
+
+
+def setup_log():
+    """Log to the console, unless logging is already set-up"""
+    if not log.handlers:
+        lib.setup_log()
+
+
+# Keys
+BATCH = 'batch'
+SEQUENCE = 'sequence'
+ACK = 'ack'
+ACKS = 'acks'
+
+
+class ClientQueue(object):
+    """Queue of commands, ordered per client
+     _________________________________
+    |                                 |
+    | client_a:  | 0 |  | 2 |         |
+    | client_b:  | 1 |                |
+    |_________________________________|
+
+    Commands are handed out one client at a time; a client's
+    next command is not handed out until its previous command
+    has been marked as done via :meth:`task_done`.
+
+    Commands from separate clients may thereby be executed
+    concurrently, whereas commands from a single client are
+    executed in the order in which they were put.
+
+    Time spent waiting in the queue is recorded under the
+    'server.queue_wait' timer of :mod:`lib.stats`.
+
+    """
+
+    def __init__(self):
+        self.lanes = dict()  # {client: deque of items}
+        self.active = set()  # Clients with an item handed out or ready
+        self.ready = queue.Queue()  # Clients with an item to hand out
+        self.outstanding = 0
+
+        self.lock = threading.Lock()
+        self.finished = threading.Condition(self.lock)
+
+    def put(self, client, item):
+        with self.lock:
+            self.lanes.setdefault(client, collections.deque()).append(
+                (time.time(), item))
+            self.outstanding += 1
+
+            if client not in self.active:
+                self.active.add(client)
+                self.ready.put(client)
+
+    def get(self):
+        """Return next (client, item), blocking until one is available"""
+        client = self.ready.get(block=True)
+
+        with self.lock:
+            queued, item = self.lanes[client].popleft()
+
+        lib.stats.record('server.queue_wait', time.time() - queued)
+        return client, item
+
+    def task_done(self, client):
+        with self.lock:
+            self.outstanding -= 1
+
+            if self.lanes[client]:
+                self.ready.put(client)
+            else:
+                self.active.discard(client)
+                del self.lanes[client]
+
+            if self.outstanding == 0:
+                self.finished.notify_all()
+
+    def join(self):
+        """Block until every item put has been marked as done"""
+        with self.lock:
+            while self.outstanding:
+                self.finished.wait()
+
+    def empty(self):
+        with self.lock:
+            return self.outstanding == 0
+
+
+@pifou.lib.log
+class Pipeline(object):
+    """Return results without awaiting confirmation of each
+     _____________________________
+    |                             |
+    |   --> 1   --> 2   --> 3     |
+    |   <-- ack 2       <-- ack 3 |
+    |_____________________________|
+
+    Results are numbered per client under SEQUENCE and sent as
+    they become available. Clients acknowledge results either
+    cumulatively, with the highest SEQUENCE received under ACK,
+    or in batches, with a list of sequences under ACKS. Plain
+    replies, such as those of REP clients, acknowledge the oldest
+    unacknowledged result; REP sockets reply strictly in order.
+
+    Results not acknowledged within `timeout` seconds are sent
+    again, up to `retries` times, after which they are dropped.
+    Clients should ignore sequences already received.
+
+    All sockets are owned by a single thread; results are handed
+    to it via :meth:`send`, which never blocks, over an inproc
+    socket polled along with those of clients.
+
+    Arguments:
+        timeout (float): Seconds awaiting acknowledgement
+        retries (int): Number of times a result is sent again
+
+    """
+
+    def __init__(self, timeout=5.0, retries=3):
+        self.timeout = timeout
+        self.retries = retries
+
+        # Results from workers, each sending from a socket of its own
+        self.outbox_address = "inproc://pipeline-%x" % id(self)
+        self.outbox = zmq.Context.instance().socket(zmq.PULL)
+        self.outbox.bind(self.outbox_address)
+        self.local = threading.local()
+
+        self.sockets = dict()  # {client: socket}
+        self.sequences = dict()  # {client: last sequence}
+
+        # {client: {sequence: [message, time sent, attempts]}}
+        self.unacked = dict()
+
+        thread = threading.Thread(target=self.thread,
+                                  name='pipeline_thread')
+        thread.daemon = True
+        thread.start()
+
+    def send(self, client, message):
+        outbox = getattr(self.local, 'outbox', None)
+        if outbox is None:
+            outbox = zmq.Context.instance().socket(zmq.PUSH)
+            outbox.connect(self.outbox_address)
+            self.local.outbox = outbox
+
+        outbox.send_json([client, message])
+
+    def thread(self):
+        poller = zmq.Poller()
+        poller.register(self.outbox, zmq.POLLIN)
+        clients = dict()  # {socket: client}
+
+        while True:
+            for socket, _ in poller.poll(timeout=self.next_expiry()):
+                if socket is not self.outbox:
+                    # Acknowledgements
+                    #  __________
+                    # |          |
+                    # |   <---   |
+                    # |__________|
+                    frames = socket.recv_multipart()
+                    self.acknowledge(clients[socket],
+                                     json.loads(frames[-1]))
+                    continue
+
+                # Results
+                #  __________
+                # |          |
+                # |   --->   |
+                # |__________|
+                client, message = socket.recv_json()
+
+                if client not in self.sockets:
+                    socket = zmq.Context.instance().socket(zmq.DEALER)
+                    socket.connect(client)
+                    poller.register(socket, zmq.POLLIN)
+                    clients[socket] = client
+                    self.sockets[client] = socket
+
+                sequence = self.sequences.get(client, 0) + 1
+                self.sequences[client] = sequence
+                message[SEQUENCE] = sequence
+
+                self.transmit(client, message)
+                self.unacked.setdefault(client, dict())[sequence] = [
+                    message, time.time(), 0]
+
+            self.expire()
+
+    def next_expiry(self):
+        """Return milliseconds until a result is to be sent again
+
+        Returns:
+            None if there are no unacknowledged results
+
+        """
+
+        sent = [pending[1]
+                for unacked in self.unacked.values()
+                for pending in unacked.values()]
+
+        if not sent:
+            return None
+
+        return max(0, (min(sent) + self.timeout - time.time()) * 1000)
+
+    def transmit(self, client, message):
+        # Empty delimiter, as expected by REP sockets
+        self.sockets[client].send_multipart(['', json.dumps(message)])
+
+    def acknowledge(self, client, message):
+        unacked = self.unacked.get(client, dict())
+
+        if ACK in message:
+            for sequence in unacked.keys():
+                if sequence <= message[ACK]:
+                    del unacked[sequence]
+
+        for sequence in message.get(ACKS, list()):
+            unacked.pop(sequence, None)
+
+        if ACK not in message and ACKS not in message and unacked:
+            del unacked[min(unacked)]
+
+        if message.get(constant.STATUS, constant.OK) != constant.OK:
+            self.log.error("    Client reported failure")
+
+    def expire(self):
+        now = time.time()
+
+        for client, unacked in self.unacked.items():
+            for sequence, pending in unacked.items():
+                message, sent, attempts = pending
+
+                if now - sent < self.timeout:
+                    continue
+
+                if attempts >= self.retries:
+                    self.log.error("Result %i to %s was never acknowledged"
+                                   % (sequence, client))
+                    del unacked[sequence]
+                    continue
+
+                self.log.warning("Sending result %i to %s again"
+                                 % (sequence, client))
+                self.transmit(client, message)
+                pending[1:] = [now, attempts + 1]
+
 
 @pifou.lib.log
 class Server(object):
+    """Command server
+
+    Arguments:
+        receiver (object): Receiver of executed commands
+        workers (int): Number of commands executed concurrently
+        pipelined (bool): Return results without awaiting the
+            confirmation of each, see :class:`Pipeline`
+
+    """
 
-    queue = queue.Queue()  # Commands about to be executed
     commands = dict()  # Executed commands
     clients = dict()  # Connected clients
 
-    def __init__(self, receiver):
+    def __init__(self, receiver, workers=4, pipelined=False):
+        setup_log()
+
         self.receiver = receiver
+        self.workers = workers
+        self.queue = ClientQueue()  # Commands about to be executed
+        self.pipeline = Pipeline() if pipelined else None
 
+        self.listen()
+
+    def listen(self):
+        """Bind sockets and start serving"""
         init_in = "tcp://*:7000"
         commands_in = "tcp://*:7001"
         commands_out = "tcp://localhost:7002"
 
         self.init_in = endpoint.create_consumer(init_in)
-        self.commands_in = endpoint.create_consumer(commands_in)
         self.commands_out = endpoint.create_producer(commands_out)
 
+        # Replies to blocking commands are deferred until the command
+        # has finished, without holding up requests from other clients.
+        self.commands_in = zmq.Context.instance().socket(zmq.ROUTER)
+        self.commands_in.bind(commands_in)
+
+        # Workers signal finished blocking commands to the receiver
+        self.finished_address = "inproc://finished-%x" % id(self)
+        self.finished = zmq.Context.instance().socket(zmq.PULL)
+        self.finished.bind(self.finished_address)
+
         self.init_listen()
         self.commands_listen()
 
-    def commands_listen(self):
-        def process_command(in_message):
-            """
-                __________
-               |          |
-               |   /\/\   |
-               |__________|
+    def process_init(self, in_message):
+        command, args, kwargs = (in_message[constant.COMMAND],
+                                 in_message.get(constant.ARGS, []),
+                                 in_message.get(constant.KWARGS, {}))
+
+        out_message = {constant.STATUS: constant.FAIL}
+
+        if command == 'clients':
+            out_message[constant.RESULT] = self.clients.keys()
+            out_message[constant.STATUS] = constant.OK
+
+        elif command == 'stats':
+            out_message[constant.RESULT] = lib.stats.snapshot()
+            out_message[constant.STATUS] = constant.OK
+
+        elif command == 'connect':
+            client = in_message[constant.ID]
+            self.connect(client)
+
+            info = "%s registered" % client
+            out_message[constant.STATUS] = constant.OK
+            out_message[constant.INFO] = info
+            self.log.info(info)
+
+        return out_message
+
+    def connect(self, client):
+        """Register `client`, to which results are returned
+
+        Arguments:
+            client (str): Endpoint of client, e.g. tcp://host:port
+
+        """
+
+        # Pipelined results are sent by the pipeline
+        producer = None
+        if self.pipeline is None:
+            producer = endpoint.create_producer(client)
+        self.clients[client] = producer
+
+    def process_command(self, in_message):
+        """
+            __________
+           |          |
+           |   /\/\   |
+           |__________|
+
+        Returns:
+            Tuple of output message and, for blocking commands,
+            an event set once the command has finished.
 
-            """
+        """
+
+        out_message = {constant.STATUS: constant.FAIL}
+
+        client_id = in_message[constant.ID]
+        commands_out = self.clients[client_id]
+
+        command, args, kwargs = (
+            in_message[constant.COMMAND],
+            in_message.get(constant.ARGS, []),
+            in_message.get(constant.KWARGS, {}))
 
-            out_message = {constant.STATUS: constant.FAIL}
+        if command == BATCH:
+            entries = in_message.get(BATCH)
+            if not isinstance(entries, list):
+                out_message[constant.INFO] = "%r expects a list" % BATCH
+                return out_message, None
 
-            client_id = in_message[constant.ID]
-            commands_out = self.clients[client_id]
+            command_inst = BatchCommand(
+                [self.create_entry(entry) for entry in entries],
+                receiver=self.receiver)
 
-            command, args, kwargs = (
-                in_message[constant.COMMAND],
-                in_message.get(constant.ARGS, []),
-                in_message.get(constant.KWARGS, {}))
+        elif command not in COMMANDS:
+            out_message[constant.INFO] = "%r not available" % command
+            return out_message, None
 
+        else:
             try:
-                command_cls = COMMANDS[command]
-            except KeyError:
-                out_message[constant.INFO] = "%r not available" % command
-                return out_message
+                command_inst = self.create_command(command, args, kwargs)
+            except Exception as e:
+                out_message[constant.INFO] = "%r failed: %s" % (command, e)
+                return out_message, None
 
-            kwargs['receiver'] = self.receiver
-            command_inst = command_cls(*args, **kwargs)
+        # Store in queue
+        #  _________
+        # |         |
+        # |    |    |
+        # |    V    |
+        # |_________|
 
-            # Store in queue
-            #  _________
-            # |         |
-            # |    |    |
-            # |    V    |
-            # |_________|
+        done = threading.Event()
+        item = (command_inst,
+                commands_out,
+                done)
 
-            item = (command_inst,
-                    commands_out)
+        # Queue request
+        self.log.info("Storing %r in queue" % command)
+        self.queue.put(client_id, item)
+        self.log.info("Stored")
 
-            # Queue request
-            self.log.info("Storing %r in queue" % command)
-            self.queue.put(item)
-            self.log.info("Stored")
+        out_message[constant.STATUS] = constant.OK
 
-            out_message[constant.STATUS] = constant.OK
+        if command_inst.blocking is True:
+            self.log.info("-|-  Blocking %r.." % command)
+            return out_message, done
 
-            if command_inst.blocking is True:
-                self.log.info("-|-  Blocking..")
-                self.queue.join()
-                self.log.info("---  Unblocking")
+        return out_message, None
+
+    def create_command(self, command, args, kwargs):
+        """Return instance of `command`, operating on the receiver
+
+        Raises:
+            KeyError if `command` is not available
+
+        """
+
+        if command not in COMMANDS:
+            raise KeyError(command)
+
+        command_cls = COMMANDS[command]
+        kwargs['receiver'] = self.receiver
+        return command_cls(*args, **kwargs)
+
+    def create_entry(self, entry):
+        """Return instance of command of batch `entry`
 
-            return out_message
+        Entries that are malformed, unavailable or fail to
+        construct are returned as a :class:`FailedCommand`,
+        such that they fail on their own within the batch.
 
+        """
+
+        if not isinstance(entry, dict) or constant.COMMAND not in entry:
+            return FailedCommand("Malformed entry: %r" % (entry,))
+
+        command = entry[constant.COMMAND]
+        if command not in COMMANDS:
+            return FailedCommand("%r not available" % command)
+
+        try:
+            return self.create_command(command,
+                                       entry.get(constant.ARGS, []),
+                                       entry.get(constant.KWARGS, {}))
+        except Exception as e:
+            return FailedCommand("%r failed: %s" % (command, e))
+
+    def commands_listen(self):
         def thread():
-            while True:
-                #  __________
-                # |          |
-                # |   <---   |
-                # |__________|
-                in_message = self.commands_in.recv_json()
+            poller = zmq.Poller()
+            poller.register(self.commands_in, zmq.POLLIN)
+            poller.register(self.finished, zmq.POLLIN)
 
-                #  __________
-                # |          |
-                # |   /\/\   |
-                # |__________|
-                out_message = process_command(in_message)
+            blocked = list()  # [(envelope, out_message, done), ..]
 
-                # Prepare output
-                #  __________
-                # |          |
-                # |   --->   |
-                # |__________|
-                self.commands_in.send_json(out_message)
+            while True:
+                events = dict(poller.poll())
+
+                if self.finished in events:
+                    self.finished.recv()
+                    self.unblock(blocked)
+
+                if self.commands_in in events:
+                    #  __________
+                    # |          |
+                    # |   <---   |
+                    # |__________|
+                    frames = self.commands_in.recv_multipart()
+                    envelope, in_message = frames[:-1], frames[-1]
+
+                    #  __________
+                    # |          |
+                    # |   /\/\   |
+                    # |__________|
+                    out_message, done = self.process_command(
+                        json.loads(in_message))
+
+                    if done is not None:
+                        blocked.append((envelope, out_message, done))
+
+                        # It may have finished already
+                        self.unblock(blocked)
+                    else:
+                        self.reply(envelope, out_message)
 
         # Start receiver
         receiver_thread = threading.Thread(target=thread,
@@ -140,40 +542,19 @@ class Server(object):
         receiver_thread.start()
         self.log.info("Listening on commands")
 
-        # Start worker
-        worker_thread = threading.Thread(target=self.worker,
-                                         name='worker_thread')
-        worker_thread.daemon = True
-        worker_thread.start()
-        self.log.info("Worker started")
+        self.start_workers()
+
+    def start_workers(self):
+        for number in range(self.workers):
+            worker_thread = threading.Thread(target=self.worker,
+                                             name='worker_thread_%i' % number)
+            worker_thread.daemon = True
+            worker_thread.start()
+        self.log.info("%i workers started" % self.workers)
 
     def init_listen(self):
         """Init channel"""
 
-        def process_init(in_message):
-            command, args, kwargs = (in_message[constant.COMMAND],
-                                     in_message.get(constant.ARGS, []),
-                                     in_message.get(constant.KWARGS, {}))
-
-            out_message = {constant.STATUS: constant.FAIL}
-
-            if command == 'clients':
-                out_message[constant.RESULT] = self.clients.keys()
-                out_message[constant.STATUS] = constant.OK
-
-            elif command == 'connect':
-                client = in_message[constant.ID]
-
-                producer = endpoint.create_producer(client)
-                self.clients[client] = producer
-
-                info = "%s registered" % client
-                out_message[constant.STATUS] = constant.OK
-                out_message[constant.INFO] = info
-                self.log.info(info)
-
-            return out_message
-
         def thread():
             while True:
                 #  __________
@@ -186,7 +567,7 @@ class Server(object):
                 # |          |
                 # |   /\/\   |
                 # |__________|
-                out_message = process_init(in_message)
+                out_message = self.process_init(in_message)
 
                 # Prepare output
                 #  __________
@@ -201,6 +582,49 @@ class Server(object):
         init_thread.start()
         self.log.info("Listening on init")
 
+    def execute(self, command):
+        """Execute `command` and return results message
+
+        Note:
+            This method can never fail. Failure is handled by client.
+
+        """
+
+        # Prepare output
+        #  __________
+        # |          |
+        # |   ~~~>   |
+        # |__________|
+
+        message = {constant.STATUS: constant.FAIL}
+
+        # Execute command
+        #  ___________
+        # |           |
+        # |    ...    |
+        # |___________|
+
+        self.log.info("Executing command.. %s" % command)
+
+        try:
+            with lib.stats.timer('server.execute'):
+                return_value = command.do()
+            message[constant.RESULT] = return_value
+            message[constant.STATUS] = constant.OK
+            self.log.info("Command executed")
+
+            if isinstance(command, BatchCommand) and command.failed:
+                message[constant.STATUS] = constant.FAIL
+                message[constant.INFO] = ("%i of %i commands failed"
+                                          % (command.failed,
+                                             len(command.commands)))
+
+        except Exception as e:
+            message[constant.INFO] = str(e)
+            self.log.error("Command failed")
+
+        return message
+
     def worker(self):
         """This function is responsible for the order of execution.
         _                                    _
@@ -210,75 +634,251 @@ class Server(object):
         |____________________________________|
 
         Both synchronous and asynchronous commands are stored
-        in this queue.
+        in this queue. Each worker executes one command at a time,
+        and a client's commands are executed one at a time.
 
         Note:
             This method can never fail. Failure is handled by client.
 
         """
 
+        finished = zmq.Context.instance().socket(zmq.PUSH)
+        finished.connect(self.finished_address)
+
         while True:
-            command, commands_out = self.queue.get(block=True)
+            client_id, (command, commands_out, done) = self.queue.get()
+
+            message = self.execute(command)
 
-            # Prepare output
+            # Return value to client
             #  __________
             # |          |
-            # |   ~~~>   |
+            # |   --->   |
             # |__________|
 
-            message = {constant.STATUS: constant.FAIL}
+            self.respond(client_id, commands_out, message)
 
-            # Execute command
-            #  ___________
-            # |           |
-            # |    ...    |
-            # |___________|
+            self.queue.task_done(client_id)
+            done.set()
 
-            self.log.info("Executing command.. %s" % command)
+            if command.blocking:
+                finished.send('')
 
-            try:
-                return_value = command.do()
-                message[constant.RESULT] = return_value
-                message[constant.STATUS] = constant.OK
-                self.log.info("Command executed")
+            if self.queue.empty():
+                self.log.info("Queue is empty")
 
-            except Exception as e:
-                message[constant.INFO] = str(e)
-                self.log.error("Command failed")
+    def reply(self, envelope, out_message):
+        """Reply to request on `commands_in` with `out_message`
 
-            # Return value to client
-            #  __________
-            # |          |
-            # |   --->   |
-            # |__________|
+        Arguments:
+            envelope (list): Routing frames of the request
+            out_message (dict): Reply
 
-            self.log.info("--> Returning results..")
+        """
 
-            commands_out.send_json(message)
+        #  __________
+        # |          |
+        # |   --->   |
+        # |__________|
+        self.commands_in.send_multipart(envelope + [json.dumps(out_message)])
+
+    def unblock(self, blocked):
+        """Reply to blocking commands in `blocked` that have finished"""
+        for pending in blocked[:]:
+            envelope, out_message, done = pending
+            if done.is_set():
+                self.log.info("---  Unblocking")
+                self.reply(envelope, out_message)
+                blocked.remove(pending)
 
-            # Await confirmation
-            #  __________
-            # |          |
-            # |   <---   |
-            # |__________|
+    def respond(self, client_id, commands_out, message):
+        """Return results `message` of a command to `client_id`
 
-            self.log.info("    Results returned, awaiting confirmation..")
-            message = commands_out.recv_json()
-            self.log.info("<-- Confirmation received")
+        Unless pipelined, this blocks until the client
+        has confirmed receipt of the results.
 
-            if message[constant.STATUS] != constant.OK:
-                self.log.error("    Client reported failure")
+        """
 
-            self.queue.task_done()
+        if self.pipeline is not None:
+            self.log.info("--> Queueing results..")
+            self.pipeline.send(client_id, message)
+            return
 
-            if self.queue.empty():
-                self.log.info("Queue is empty")
+        self.log.info("--> Returning results..")
+
+        started = time.time()
+        commands_out.send_json(message)
+
+        # Await confirmation
+        #  __________
+        # |          |
+        # |   <---   |
+        # |__________|
+
+        self.log.info("    Results returned, awaiting confirmation..")
+        message = commands_out.recv_json()
+        self.log.info("<-- Confirmation received")
+        lib.stats.record('server.respond', time.time() - started)
+
+        if message[constant.STATUS] != constant.OK:
+            self.log.error("    Client reported failure")
 
     def stop(self):
         self.incoming.close()
         print "Server stopped"
 
 
+@pifou.lib.log
+class RouterServer(Server):
+    """Command server multiplexing every channel on a single thread
+     ______________________________________
+    |                                      |
+    |  init_in  ---\                       |
+    |  commands_in --- loop <--- workers   |
+    |  results  ---/                       |
+    |______________________________________|
+
+    Init and commands are received on ROUTER sockets, and results
+    are returned and confirmed from the same thread, which thereby
+    serves any number of clients. Clients and the wire protocol are
+    the same as for :class:`Server`.
+
+    Clients receive results on a REP socket, which only accepts
+    REQ and DEALER peers; each client is therefore returned results
+    through a DEALER socket of its own, owned by the loop.
+
+    A client's next command is executed once it has confirmed
+    receipt of the results of its previous command.
+
+    Arguments:
+        receiver (object): Receiver of executed commands
+        workers (int): Number of commands executed concurrently
+
+    """
+
+    def __init__(self, receiver, workers=4):
+        super(RouterServer, self).__init__(receiver, workers)
+
+    def listen(self):
+        context = zmq.Context.instance()
+
+        self.init_in = context.socket(zmq.ROUTER)
+        self.init_in.bind("tcp://*:7000")
+
+        self.commands_in = context.socket(zmq.ROUTER)
+        self.commands_in.bind("tcp://*:7001")
+
+        # Results from workers
+        self.inbox_address = "inproc://results-%x" % id(self)
+        self.inbox = context.socket(zmq.PULL)
+        self.inbox.bind(self.inbox_address)
+
+        self.poller = zmq.Poller()
+        for socket in (self.init_in, self.commands_in, self.inbox):
+            self.poller.register(socket, zmq.POLLIN)
+
+        self.results_out = dict()  # {socket: client}
+        self.inflight = dict()  # {client: done event}
+        self.returned = dict()  # {client: time results were returned}
+
+        loop_thread = threading.Thread(target=self.loop,
+                                       name='loop_thread')
+        loop_thread.daemon = True
+        loop_thread.start()
+        self.log.info("Listening on init and commands")
+
+        self.start_workers()
+
+    def connect(self, client):
+        # Called from the loop, which owns the socket
+        socket = zmq.Context.instance().socket(zmq.DEALER)
+        socket.connect(client)
+
+        self.poller.register(socket, zmq.POLLIN)
+        self.results_out[socket] = client
+        self.clients[client] = socket
+
+    def loop(self):
+        blocked = list()  # [(envelope, out_message, done), ..]
+
+        while True:
+            for socket, _ in self.poller.poll():
+                if socket is self.init_in:
+                    frames = socket.recv_multipart()
+                    out_message = self.process_init(json.loads(frames[-1]))
+                    socket.send_multipart(
+                        frames[:-1] + [json.dumps(out_message)])
+
+                elif socket is self.commands_in:
+                    frames = socket.recv_multipart()
+                    envelope, in_message = frames[:-1], frames[-1]
+
+                    out_message, done = self.process_command(
+                        json.loads(in_message))
+
+                    if done is not None:
+                        blocked.append((envelope, out_message, done))
+                    else:
+                        self.reply(envelope, out_message)
+
+                elif socket is self.inbox:
+                    client, message = socket.recv_json()
+
+                    #  __________
+                    # |          |
+                    # |   --->   |
+                    # |__________|
+                    self.log.info("--> Returning results to %s" % client)
+
+                    # Empty delimiter, as expected by REP sockets
+                    self.clients[client].send_multipart(
+                        ['', json.dumps(message)])
+                    self.returned[client] = time.time()
+
+                else:
+                    #  __________
+                    # |          |
+                    # |   <---   |
+                    # |__________|
+                    frames = socket.recv_multipart()
+                    self.confirm(self.results_out[socket],
+                                 json.loads(frames[-1]))
+                    self.unblock(blocked)
+
+    def worker(self):
+        outbox = zmq.Context.instance().socket(zmq.PUSH)
+        outbox.connect(self.inbox_address)
+
+        while True:
+            client_id, (command, _, done) = self.queue.get()
+
+            message = self.execute(command)
+
+            self.inflight[client_id] = done
+            outbox.send_json([client_id, message])
+
+    def confirm(self, client, message):
+        """Client has confirmed receipt of results"""
+        self.log.info("<-- Confirmation received")
+
+        if message[constant.STATUS] != constant.OK:
+            self.log.error("    Client reported failure")
+
+        returned = self.returned.pop(client, None)
+        if returned is not None:
+            lib.stats.record('server.respond', time.time() - returned)
+
+        done = self.inflight.pop(client, None)
+        if done is None:
+            return
+
+        self.queue.task_done(client)
+        done.set()
+
+        if self.queue.empty():
+            self.log.info("Queue is empty")
+
+
 class ConnectCommand(pifou.com.command.AbstractCommand):
     def __init__(self, endpoint, *args, **kwargs):
         super(ConnectCommand, self).__init__(*args, **kwargs)
@@ -305,6 +905,64 @@ class ReferenceCommand(pifou.com.command.AbstractCommand):
         return self.receiver.import_reference(path=self.path)
 
 
+class BatchCommand(pifou.com.command.AbstractCommand):
+    """Execute multiple commands as a unit, in order
+
+    Failure of one command does not prevent the execution of the
+    next; results are returned per command, each with a status of
+    its own, in a single message.
+
+    Message:
+        {"id": "tcp://host:port",
+         "command": "batch",
+         "batch": [{"command": "import", "args": ["/a.ma"]},
+                   {"command": "import", "args": ["/b.ma"]}]}
+
+    Arguments:
+        commands (list): Instances of commands to execute
+
+    """
+
+    def __init__(self, commands, *args, **kwargs):
+        super(BatchCommand, self).__init__(*args, **kwargs)
+        self.commands = commands
+        self.blocking = any(command.blocking for command in commands)
+        self.failed = 0
+
+    def do(self):
+        results = list()
+        self.failed = 0
+
+        for command in self.commands:
+            result = {constant.STATUS: constant.FAIL}
+
+            try:
+                result[constant.RESULT] = command.do()
+                result[constant.STATUS] = constant.OK
+            except Exception as e:
+                result[constant.INFO] = str(e)
+                self.failed += 1
+
+            results.append(result)
+
+        return results
+
+
+class FailedCommand(pifou.com.command.AbstractCommand):
+    """Stand-in for an entry of a batch that could not be created
+
+    Not available by name; see :meth:`Server.create_entry`.
+
+    """
+
+    def __init__(self, info, *args, **kwargs):
+        super(FailedCommand, self).__init__(*args, **kwargs)
+        self.info = info
+
+    def do(self):
+        raise ValueError(self.info)
+
+
 COMMANDS = {}
 for command in (
         ConnectCommand,
@@ -20,6 +20,7 @@ import pigui.pyqt5.widgets.miller.view
 # local library
 import lib.view
 import lib.model
+import lib.delegate
 import lib.settings
 
 pigui.style.register('lib')
@@ -31,11 +32,14 @@ class Lib(pigui.pyqt5.widgets.application.widget.ApplicationBase):
     """
     Signals:
         import_version (str): A domain-version is being imported
+        import_versions (list): Selected domain-versions are
+            being imported at once
         import_file (str): A plain file is being imported
 
     """
 
     import_version = QtCore.pyqtSignal(str)
+    import_versions = QtCore.pyqtSignal(object)
     import_file = QtCore.pyqtSignal(str)
 
     def __init__(self, support=tuple(), parent=None):
@@ -56,8 +60,73 @@ class Lib(pigui.pyqt5.widgets.application.widget.ApplicationBase):
         view.setSizePolicy(QtWidgets.QSizePolicy.MinimumExpanding,
                            QtWidgets.QSizePolicy.MinimumExpanding)
 
-        layout = QtWidgets.QHBoxLayout(canvas)
+        # Type-ahead filtering of loaded items, see Model.filter
+        filter_ = QtWidgets.QLineEdit()
+        filter_.setObjectName('Filter')
+        filter_.setPlaceholderText('Filter..')
+
+        sort = QtWidgets.QComboBox()
+        sort.setObjectName('Sort')
+        sort.addItems(lib.model.SORT_MODES)
+
+        toolbar = QtWidgets.QHBoxLayout()
+        toolbar.setContentsMargins(0, 0, 0, 0)
+        toolbar.addWidget(filter_)
+        toolbar.addWidget(sort)
+
+        # Search of the whole library, see set_search
+        search = QtWidgets.QLineEdit()
+        search.setObjectName('Search')
+        search.setPlaceholderText('Search library..')
+        search.returnPressed.connect(self.on_search)
+        search.hide()
+
+        results = QtWidgets.QListWidget()
+        results.setObjectName('Results')
+        results.itemActivated.connect(self.on_result_activated)
+        results.hide()
+
+        # Tabs and bookmarks, see set_session
+        tabs = QtWidgets.QTabBar()
+        tabs.setObjectName('Tabs')
+        tabs.setTabsClosable(True)
+        tabs.setExpanding(False)
+
+        new_tab = QtWidgets.QToolButton()
+        new_tab.setObjectName('NewTab')
+        new_tab.setText('+')
+        new_tab.clicked.connect(self.on_new_tab)
+
+        bookmarks = QtWidgets.QToolButton()
+        bookmarks.setObjectName('Bookmarks')
+        bookmarks.setText('Bookmarks')
+        bookmarks.setPopupMode(QtWidgets.QToolButton.InstantPopup)
+        bookmarks.setMenu(QtWidgets.QMenu(bookmarks))
+        bookmarks.menu().aboutToShow.connect(self.on_bookmarks_menu)
+
+        tabbar = QtWidgets.QWidget()
+        tabbar.hide()
+
+        layout = QtWidgets.QHBoxLayout(tabbar)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.addWidget(tabs)
+        layout.addWidget(new_tab)
+        layout.addStretch()
+        layout.addWidget(bookmarks)
+
+        # Changes to tabs and bookmarks are saved once settled,
+        # and upon close, rather than upon every change.
+        save_timer = QtCore.QTimer(self)
+        save_timer.setSingleShot(True)
+        save_timer.setInterval(lib.settings.SESSION_DELAY)
+        save_timer.timeout.connect(self.save_session)
+
+        layout = QtWidgets.QVBoxLayout(canvas)
         layout.setContentsMargins(1, 1, 1, 1)
+        layout.addWidget(tabbar)
+        layout.addWidget(search)
+        layout.addWidget(results)
+        layout.addLayout(toolbar)
         layout.addWidget(view)
 
         widget = QtWidgets.QWidget()
@@ -70,6 +139,17 @@ class Lib(pigui.pyqt5.widgets.application.widget.ApplicationBase):
         self.set_widget(widget)
 
         self.view = view
+        self.filter = filter_
+        self.sort = sort
+        self.search = search
+        self.results = results
+        self.search_index = None
+        self.tabbar = tabbar
+        self.tabs = tabs
+        self.bookmarks = bookmarks
+        self.session = None
+        self.save_timer = save_timer
+        self.selected = set()  # Indexes of selected files and versions
         self.model = None
         self.support = support
 
@@ -84,14 +164,207 @@ class Lib(pigui.pyqt5.widgets.application.widget.ApplicationBase):
         """
 
         self.view.set_model(model)
+        self.filter.textChanged.connect(model.filter)
+        self.sort.currentIndexChanged[str].connect(model.set_sort_mode)
         self.model = model
 
+    def set_search(self, index):
+        """Search library using `index`
+
+        Arguments:
+            index (lib.search.Index): Index of the library root
+
+        """
+
+        self.search_index = index
+        self.search.show()
+
+    def on_search(self):
+        query = self.search.text()
+        self.results.clear()
+
+        if not query:
+            self.results.hide()
+            return
+
+        for path, typ in self.search_index.search(query):
+            label = path
+            for root in self.model.roots:
+                if lib.model.within(path, root):
+                    label = os.path.relpath(path, root)
+                    break
+
+            item = QtWidgets.QListWidgetItem(label)
+            item.setData(QtCore.Qt.UserRole, (path, typ))
+            self.results.addItem(item)
+
+        self.results.setVisible(self.results.count() > 0)
+        self.notify("%i results" % self.results.count())
+
+    def on_result_activated(self, item):
+        """Jump to activated search result"""
+        path, typ = item.data(QtCore.Qt.UserRole)
+
+        index = self.model.reveal(path, typ)
+        if index is None:
+            self.notify("%s no longer exists" % os.path.basename(path))
+            return
+
+        lib.view.expand(self.model, index)
+        self.results.hide()
+
+    def set_session(self, session):
+        """Keep tabs and bookmarks in `session`
+
+        Tabs are restored from `session`, unless it was left
+        with other roots than those of the model.
+
+        Arguments:
+            session (lib.session.Session): Tabs and bookmarks
+
+        """
+
+        if session.roots != self.model.roots:
+            session.clear(self.model.roots)
+
+        if not session.tabs:
+            session.tabs.append({'name': self.tab_name(),
+                                 'snapshot': None})
+
+        self.session = session
+        self.tabbar.show()
+
+        self.tabs.blockSignals(True)
+        for tab in session.tabs:
+            self.tabs.addTab(tab['name'])
+        self.tabs.setCurrentIndex(session.current)
+        self.tabs.blockSignals(False)
+
+        self.tabs.currentChanged.connect(self.on_tab_changed)
+        self.tabs.tabCloseRequested.connect(self.on_tab_closed)
+
+        self.restore(session.tabs[session.current]['snapshot'])
+
+    def tab_name(self):
+        """Return name of the most recently pulled directory"""
+        index = self.model.current or self.model.root_item.index
+        return os.path.basename(self.model.data(index, 'path')) or '/'
+
+    def store_tab(self):
+        """Snapshot model into the current tab"""
+        tab = self.session.tabs[self.session.current]
+        tab['snapshot'] = self.model.snapshot()
+        tab['name'] = self.tab_name()
+        self.tabs.setTabText(self.session.current, tab['name'])
+
+    def restore(self, snapshot):
+        """Restore model from `snapshot`, or from its roots if None"""
+        if snapshot is None:
+            self.model.clear()
+            self.model.setup(self.model.roots)
+            return
+
+        index = self.model.restore(snapshot)
+        if index is not None:
+            lib.view.expand(self.model, index)
+
+    def on_new_tab(self):
+        self.session.tabs.append({'name': os.path.basename(
+            self.model.roots[0]), 'snapshot': None})
+        self.tabs.addTab(self.session.tabs[-1]['name'])
+        self.tabs.setCurrentIndex(len(self.session.tabs) - 1)
+
+    def on_tab_changed(self, number):
+        if number < 0:
+            return
+
+        self.store_tab()
+        self.session.current = number
+        self.restore(self.session.tabs[number]['snapshot'])
+        self.save_timer.start()
+
+    def on_tab_closed(self, number):
+        if len(self.session.tabs) < 2:
+            return
+
+        if number == self.session.current:
+            # Switching tabs stores the tab being closed
+            self.tabs.setCurrentIndex(number - 1 if number else 1)
+
+        self.session.tabs.pop(number)
+        if self.session.current > number:
+            self.session.current -= 1
+
+        self.tabs.blockSignals(True)
+        self.tabs.removeTab(number)
+        self.tabs.blockSignals(False)
+        self.save_timer.start()
+
+    def on_bookmarks_menu(self):
+        menu = self.bookmarks.menu()
+        menu.clear()
+
+        action = menu.addAction("Bookmark %s" % self.tab_name())
+        action.triggered.connect(self.add_bookmark)
+        menu.addSeparator()
+
+        for number, bookmark in enumerate(self.session.bookmarks):
+            action = menu.addAction(bookmark['name'])
+            action.setToolTip(bookmark['path'])
+            action.triggered.connect(
+                lambda checked=False, number=number:
+                    self.open_bookmark(number))
+
+    def add_bookmark(self):
+        index = self.model.current or self.model.root_item.index
+        self.session.bookmarks.append(
+            {'name': self.tab_name(),
+             'path': self.model.data(index, 'path'),
+             'snapshot': self.model.snapshot()})
+        self.save_timer.start()
+
+    def open_bookmark(self, number):
+        """Restore bookmark into the current tab"""
+        bookmark = self.session.bookmarks[number]
+
+        self.store_tab()
+        self.restore(bookmark['snapshot'])
+        self.store_tab()
+        self.save_timer.start()
+
+    def save_session(self):
+        """Write tabs and bookmarks to disk
+
+        Only the tab being left is snapshotted upon switching tabs;
+        the current tab is snapshotted here, as it may have changed.
+
+        """
+
+        self.save_timer.stop()
+        self.store_tab()
+        self.session.save()
+
+    def closeEvent(self, event):
+        if self.session is not None:
+            self.save_session()
+
+        if self.model is not None and self.model.cache is not None:
+            self.model.cache.flush()
+
+        # Writes are otherwise committed after a delay
+        if self.model is not None and self.model.tags is not None:
+            self.model.tags.flush()
+
+        super(Lib, self).closeEvent(event)
+
     def event(self, event):
         """Event handlers
 
         Handled events:
             OpenInExplorerEvent -- An item is being explored
             OpenInAboutEvent -- An item is being explored, in About
+            SelectedEvent -- An item was selected, or deselected
+            TagEvent -- Tags or category of an item are being edited
 
         """
 
@@ -117,21 +390,52 @@ class Lib(pigui.pyqt5.widgets.application.widget.ApplicationBase):
             path = self.model.data(event.index, 'path')
             pigui.service.open_in_about(path)
 
+        def select(index):
+            """Keep track of selected items, imported together"""
+            if event.state == pigui.pyqt5.event.SelectedEvent.SelectedState:
+                self.selected.add(index)
+            else:
+                self.selected.discard(index)
+
+        def import_selected():
+            """Import every selected item, versions at once"""
+            versions = list()
+
+            for index in self.selected:
+                if index not in self.model.indexes:
+                    continue  # No longer loaded
+
+                path = self.model.data(index, key='path')
+                if self.model.data(index, key='type') == 'version':
+                    versions.append(path)
+                else:
+                    self.import_file.emit(path)
+
+            if versions:
+                self.import_versions.emit(versions)
+
+            self.notify("Importing %i items" % len(self.selected))
+
         def command(index):
             """A command delegate was pressed
 
             Arguments:
-                index (str): Index of file to open
+                index (str): Virtual index of command, see
+                    :func:`lib.model.split_command`
 
             Sources:
-                Imports may happen on either Versions or Files
+                Imports may happen on either Versions or Files.
+                Pressed upon a selected item, every selected item
+                is imported.
 
             """
 
-            command = self.model.data(index, key='command')
-            if command == 'import':
+            parent, command = lib.model.split_command(index)
+            if command == 'import' and parent in self.selected:
+                import_selected()
+
+            elif command == 'import':
                 source = self.model.data(index, key='source')
-                parent = self.model.data(index, key='parent')
                 path = self.model.data(parent, key='path')
 
                 if source == 'version':
@@ -143,14 +447,55 @@ class Lib(pigui.pyqt5.widgets.application.widget.ApplicationBase):
                 basename = os.path.basename(path)
                 self.notify("Importing %s" % basename)
 
+        def tag(index):
+            """Edit tags or category of `index`
+
+            Tags are entered separated by comma; an empty
+            category removes `index` from its category.
+
+            """
+
+            if self.model.tags is None:
+                return self.notify("Tagging is not available")
+
+            if event.key == lib.model.TAGS:
+                current = self.model.data(index, lib.model.TAGS) or ()
+                text, ok = QtWidgets.QInputDialog.getText(
+                    self, "Tag", "Tags, separated by comma",
+                    text=", ".join(current))
+                if not ok:
+                    return
+
+                tags = set(tag.strip() for tag in text.split(","))
+                tags.discard("")
+
+                for tag in tags - set(current):
+                    self.model.tag([index], tag)
+                for tag in set(current) - tags:
+                    self.model.untag([index], tag)
+
+            else:
+                current = self.model.data(index, lib.model.CATEGORY)
+                text, ok = QtWidgets.QInputDialog.getText(
+                    self, "Categorize", "Category",
+                    text=current or "")
+                if not ok:
+                    return
+
+                self.model.categorize([index], text.strip() or None)
+
         # Handled events
         OpenInExplorerEvent = pigui.pyqt5.event.Type.OpenInExplorerEvent
         OpenInAboutEvent = pigui.pyqt5.event.Type.OpenInAboutEvent
         CommandEvent = pigui.pyqt5.event.Type.CommandEvent
+        SelectedEvent = pigui.pyqt5.event.Type.SelectedEvent
+        TagEvent = lib.delegate.TagEvent.Type
 
         handler = {OpenInExplorerEvent: open_explorer,
                    OpenInAboutEvent: open_about,
-                   CommandEvent: command}.get(event.type())
+                   CommandEvent: command,
+                   SelectedEvent: select,
+                   TagEvent: tag}.get(event.type())
 
         if handler:
             handler(event.index)
@@ -7,6 +7,8 @@ import pifou.signal
 import pifou.metadata
 
 # pifou dependencies
+from PyQt5 import QtGui
+from PyQt5 import QtCore
 from PyQt5 import QtWidgets
 
 # pigui library
@@ -15,8 +17,96 @@ import pigui.pyqt5.event
 import pigui.pyqt5.widgets.delegate
 
 
-class FolderDelegate(pigui.pyqt5.widgets.delegate.FolderDelegate):
-    """Append context-menu"""
+class Recyclable(object):
+    """Delegate which may be re-used to represent another index"""
+
+    def bind(self, label, index, checked=False):
+        """Represent `index` as `label`
+
+        Arguments:
+            label (str): Displayed text
+            index (str): Index represented by this delegate
+            checked (bool): Whether `index` is selected
+
+        """
+
+        self.index = index
+        self.setText(label)
+        self.setChecked(checked)
+
+
+class Previewable(Recyclable):
+    """Delegate displaying a thumbnail, see :mod:`lib.thumbnail`"""
+
+    def bind(self, label, index, checked=False):
+        self.set_thumbnail(None)
+        super(Previewable, self).bind(label, index, checked)
+
+    def set_thumbnail(self, pixmap):
+        """Display `pixmap`, or no thumbnail if None"""
+        if pixmap is None:
+            self.setIcon(QtGui.QIcon())
+        else:
+            self.setIcon(QtGui.QIcon(pixmap))
+            self.setIconSize(pixmap.size())
+
+
+class TagEvent(QtCore.QEvent):
+    """Tags or category of `index` are being edited
+
+    Arguments:
+        index (str): Index of item being edited
+        key (str): Either 'tags' or 'category'
+
+    """
+
+    Type = QtCore.QEvent.Type(QtCore.QEvent.registerEventType())
+
+    def __init__(self, index, key):
+        super(TagEvent, self).__init__(self.Type)
+        self.index = index
+        self.key = key
+
+
+class Taggable(object):
+    """Delegate offering to edit tags and category of its index"""
+
+    def add_tag_actions(self, menu):
+        for label in ("Tag..",
+                      "Categorize.."):
+            action = QtWidgets.QAction(label,
+                                       self,
+                                       triggered=self.tag_event)
+            menu.addAction(action)
+
+    def tag_event(self, state):
+        key = {"Tag..": 'tags',
+               "Categorize..": 'category'}[self.sender().text()]
+
+        event = TagEvent(index=self.index, key=key)
+        QtWidgets.QApplication.postEvent(self, event)
+
+
+class FolderDelegate(Previewable,
+                     Taggable,
+                     pigui.pyqt5.widgets.delegate.FolderDelegate):
+    """Append context-menu
+
+    Signals:
+        hovered (str): Index of delegate under the mouse, or
+            receiving keyboard focus; it may be entered next
+
+    """
+
+    hovered = QtCore.pyqtSignal(object)
+
+    def enterEvent(self, event):
+        self.hovered.emit(self.index)
+        super(FolderDelegate, self).enterEvent(event)
+
+    def focusInEvent(self, event):
+        self.hovered.emit(self.index)
+        super(FolderDelegate, self).focusInEvent(event)
 
     def action_event(self, state):
         action = self.sender()
@@ -40,10 +130,14 @@ class FolderDelegate(pigui.pyqt5.widgets.delegate.FolderDelegate):
                                        triggered=self.action_event)
             menu.addAction(action)
 
+        self.add_tag_actions(menu)
+
         menu.exec_(event.globalPos())
 
 
-class FileDelegate(pigui.pyqt5.widgets.delegate.FileDelegate):
+class FileDelegate(Previewable,
+                   Taggable,
+                   pigui.pyqt5.widgets.delegate.FileDelegate):
     def selected_event(self):
         state = pigui.pyqt5.event.SelectedEvent.SelectedState
         event = pigui.pyqt5.event.SelectedEvent(state=state,
@@ -60,11 +154,43 @@ class FileDelegate(pigui.pyqt5.widgets.delegate.FileDelegate):
 
         self.setChecked(False)
 
+    def contextMenuEvent(self, event):
+        menu = QtWidgets.QMenu(self)
+        self.add_tag_actions(menu)
+        menu.exec_(event.globalPos())
+
 
 class VersionDelegate(FolderDelegate):
+    """Ctrl+click selects versions, to be imported together"""
+
+    def mousePressEvent(self, event):
+        if not event.modifiers() & QtCore.Qt.ControlModifier:
+            return super(VersionDelegate, self).mousePressEvent(event)
+
+        SelectedEvent = pigui.pyqt5.event.SelectedEvent
+        state = (SelectedEvent.DeselectedState if self.isChecked()
+                 else SelectedEvent.SelectedState)
+
+        self.setChecked(not self.isChecked())
+
+        event = SelectedEvent(state=state, index=self.index)
+        QtWidgets.QApplication.postEvent(self, event)
+
+
+class CommandDelegate(Recyclable,
+                      pigui.pyqt5.widgets.delegate.CommandDelegate):
     pass
 
 
+class LoadingDelegate(Recyclable,
+                      pigui.pyqt5.widgets.delegate.FileDelegate):
+    """Placeholder displayed whilst a column is being listed"""
+
+    def __init__(self, *args, **kwargs):
+        super(LoadingDelegate, self).__init__(*args, **kwargs)
+        self.setEnabled(False)
+
+
 if __name__ == '__main__':
     import pigui.pyqt5.util
 
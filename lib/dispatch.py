@@ -0,0 +1,212 @@
+"""Outbound messages, sent from a dedicated thread
+
+Messages are queued without blocking and sent by a thread owning
+the socket; a slow or absent receiver stalls only that thread.
+ __________        _______________        __________
+|          |      |               |      |          |
+| Qt slots |----->| bounded queue |----->| dispatch |-----> receiver
+|__________|      |_______________|      |__________|
+
+Once the queue is full, info messages are dropped; commands and
+errors take the place of queued info messages where possible.
+With the COALESCE policy, at most one info message is queued at a
+time; the latest replacing any previous still waiting to be sent.
+
+Messages that could not be sent are queued again, ahead of others,
+within the same bound; dropping info messages first, followed by
+the most recently queued.
+
+"""
+
+# standard library
+import logging
+import threading
+import collections
+
+log = logging.getLogger('lib.dispatch')
+
+# Policies for info messages
+DROP = 'drop'
+COALESCE = 'coalesce'
+
+INFO = 'info'
+
+
+class Dispatcher(object):
+    """Send JSON messages to `address` from a background thread
+
+    Arguments:
+        address (str): Endpoint of receiving PULL socket
+        maxsize (int): Maximum queued messages
+        hwm (int): Maximum messages buffered by the socket itself,
+            before sends are considered blocked
+        policy (str): DROP or COALESCE queued info messages
+        batch (int): Maximum messages sent per wake-up
+        timeout (int): Milliseconds to wait on a blocked receiver
+            before dropping info messages and retrying others
+
+    """
+
+    def __init__(self,
+                 address,
+                 maxsize=1000,
+                 hwm=100,
+                 policy=COALESCE,
+                 batch=50,
+                 timeout=1000):
+        assert policy in (DROP, COALESCE), "%s not a policy" % policy
+
+        self.address = address
+        self.maxsize = maxsize
+        self.hwm = hwm
+        self.policy = policy
+        self.batch = batch
+        self.timeout = timeout
+
+        # Messages are held in single-item lists, such that a
+        # queued info message may be replaced in-place.
+        self.queue = collections.deque()
+        self.info = None  # Queued info message, if coalescing
+        self.condition = threading.Condition()
+        self.stopped = False
+
+        self.dropped = 0
+        self.sent = 0
+
+        self.zmq = None  # Imported by the dispatching thread
+
+        thread = threading.Thread(target=self.thread,
+                                  name='dispatch_thread')
+        thread.daemon = True
+        thread.start()
+
+    def send_json(self, message):
+        """Queue `message` for sending; never blocks"""
+        with self.condition:
+            isinfo = message.get('type') == INFO
+
+            if isinfo and self.info is not None:
+                self.info[0] = message
+                return
+
+            if len(self.queue) >= self.maxsize:
+                if isinfo or not self.discard_info():
+                    self.dropped += 1
+                    log.warning("Outbox full, dropped %r" % (message,))
+                    return
+
+            holder = [message]
+            self.queue.append(holder)
+
+            if isinfo and self.policy == COALESCE:
+                self.info = holder
+
+            self.condition.notify()
+
+    def discard_info(self):
+        """Drop the oldest queued info message, if any"""
+        for holder in self.queue:
+            if holder[0].get('type') == INFO:
+                self.queue.remove(holder)
+                self.dropped += 1
+
+                if holder is self.info:
+                    self.info = None
+
+                return True
+
+        return False
+
+    def trim(self):
+        """Drop messages in excess of `maxsize`, info messages first"""
+        excess = len(self.queue) - self.maxsize
+
+        while excess > 0 and self.discard_info():
+            excess -= 1
+
+        if excess > 0:
+            for _ in range(excess):
+                holder = self.queue.pop()
+                log.warning("Outbox full, dropped %r" % (holder[0],))
+
+            self.dropped += excess
+
+    def stop(self):
+        with self.condition:
+            self.stopped = True
+            self.condition.notify()
+
+    def thread(self):
+        # Imported here, as zmq is only needed once connected
+        import zmq
+        self.zmq = zmq
+
+        context = zmq.Context.instance()
+        socket = context.socket(zmq.PUSH)
+        socket.setsockopt(zmq.SNDHWM, self.hwm)
+        socket.setsockopt(zmq.LINGER, 0)
+        socket.connect(self.address)
+
+        poller = zmq.Poller()
+        poller.register(socket, zmq.POLLOUT)
+
+        while True:
+            with self.condition:
+                while not self.queue and not self.stopped:
+                    self.condition.wait()
+
+                if self.stopped:
+                    break
+
+                batch = list()
+                while self.queue and len(batch) < self.batch:
+                    holder = self.queue.popleft()
+                    if holder is self.info:
+                        self.info = None
+                    batch.append(holder[0])
+
+            unsent = self.flush(socket, poller, batch)
+
+            if unsent:
+                # Retry, ahead of anything queued since
+                with self.condition:
+                    self.queue.extendleft([message] for message in
+                                          reversed(unsent))
+                    self.trim()
+
+        socket.close()
+
+    def flush(self, socket, poller, batch):
+        """Send `batch`, returning messages that could not be sent
+
+        Info messages are dropped rather than returned.
+
+        """
+
+        for number, message in enumerate(batch):
+            # Wait on a slow, or absent, receiver at most once
+            if self.send(socket, message) or (
+                    poller.poll(self.timeout) and
+                    self.send(socket, message)):
+                continue
+
+            unsent = [message for message in batch[number:]
+                      if message.get('type') != INFO]
+
+            self.dropped += len(batch) - number - len(unsent)
+            log.warning("Receiver blocked, %i messages pending"
+                        % len(unsent))
+
+            return unsent
+
+        return list()
+
+    def send(self, socket, message):
+        """Send `message` unless it would block, returning success"""
+        try:
+            socket.send_json(message, self.zmq.NOBLOCK)
+        except self.zmq.Again:
+            return False
+
+        self.sent += 1
+        return True
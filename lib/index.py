@@ -0,0 +1,102 @@
+"""Incremental index of display names
+
+Names are broken up into trigrams; each trigram refers to the
+indexes whose name contains it. A query is answered by intersecting
+the indexes of its trigrams, smallest first, and confirming the
+few remaining candidates by substring.
+
+    "v001_model.ma"
+     ___   ___   ___   ___
+    |v00| |001| |01_| |1_m|  ..
+    |___| |___| |___| |___|
+      |     |     |     |
+      v     v     v     v
+    {index, ..}
+
+Queries shorter than a trigram are matched against every name;
+still only in memory, and never against the disk.
+
+"""
+
+
+class NameIndex(object):
+    """Substring lookup of names, by trigram
+
+    Usage:
+        >>> index = NameIndex()
+        >>> index.add('/a', 'Model.ma')
+        >>> index.add('/b', 'rig.ma')
+        >>> sorted(index.search('MODEL'))
+        ['/a']
+        >>> sorted(index.search('.ma'))
+        ['/a', '/b']
+
+    """
+
+    def __init__(self):
+        self.names = dict()  # {index: lowercase name}
+        self.trigrams = dict()  # {trigram: set(index, ..)}
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, index):
+        return index in self.names
+
+    def add(self, index, name):
+        """Index `name` of `index`, replacing any previous name"""
+        self.discard(index)
+
+        name = name.lower()
+        self.names[index] = name
+
+        for trigram in split(name):
+            self.trigrams.setdefault(trigram, set()).add(index)
+
+    def discard(self, index):
+        name = self.names.pop(index, None)
+        if name is None:
+            return
+
+        for trigram in split(name):
+            indexes = self.trigrams[trigram]
+            indexes.discard(index)
+            if not indexes:
+                del self.trigrams[trigram]
+
+    def search(self, query):
+        """Return indexes whose name contains `query`, ignoring case
+
+        Returns:
+            Set of indexes
+
+        """
+
+        query = query.lower()
+
+        if len(query) < 3:
+            return set(index for index, name in self.names.iteritems()
+                       if query in name)
+
+        postings = list()
+        for trigram in split(query):
+            indexes = self.trigrams.get(trigram)
+            if not indexes:
+                return set()
+            postings.append(indexes)
+
+        postings.sort(key=len)
+        candidates = set(postings[0])
+        for indexes in postings[1:]:
+            candidates &= indexes
+            if not candidates:
+                return candidates
+
+        # Trigrams may be present without being adjacent
+        return set(index for index in candidates
+                   if query in self.names[index])
+
+
+def split(name):
+    """Return unique trigrams of `name`"""
+    return set(name[i:i + 3] for i in range(len(name) - 2))
@@ -0,0 +1,118 @@
+"""Single-pass directory listing
+
+Directories are read once and every entry is returned along
+with the information the model would otherwise query lazily
+off of disk; whether it is a directory, its size and mtime.
+
+On Windows and network shares, `scandir` provides this
+information from the directory listing itself, without an
+additional stat per entry.
+
+Note:
+    On Python 2, this requires the `scandir` backport; without it,
+    every entry is stat'ed individually after listing.
+
+"""
+
+# standard library
+import os
+import stat
+import collections
+
+try:
+    from os import scandir
+except ImportError:
+    try:
+        # Backport for Python < 3.5
+        from scandir import scandir
+    except ImportError:
+        scandir = None
+
+
+Entry = collections.namedtuple('Entry', ['name',
+                                         'path',
+                                         'isdir',
+                                         'size',
+                                         'mtime',
+                                         'inode'])
+
+
+def ls(path):
+    """List contents of `path`, excluding hidden entries
+
+    Arguments:
+        path (str): Absolute path to directory
+
+    Returns:
+        list of Entry, in the order returned by the file-system
+
+    Raises:
+        OSError if `path` could not be listed
+
+    """
+
+    return list(iterate(path))
+
+
+def iterate(path):
+    """Yield an Entry per item in `path`, as it is being listed
+
+    Unlike :func:`ls`, entries are made available before the
+    directory has been fully read, and OSError is raised upon
+    the first iteration.
+
+    """
+
+    if scandir is None:
+        for item in _iterate_fallback(path):
+            yield item
+        return
+
+    for dir_entry in scandir(path):
+        if dir_entry.name.startswith('.'):
+            continue
+
+        try:
+            st = dir_entry.stat()
+        except OSError:
+            # Broken links and entries removed mid-listing
+            continue
+
+        yield Entry(name=dir_entry.name,
+                    path=dir_entry.path,
+                    isdir=stat.S_ISDIR(st.st_mode),
+                    size=st.st_size,
+                    mtime=st.st_mtime,
+                    inode=st.st_ino)
+
+
+def entry(path):
+    """Return Entry for a single `path`, or None if missing
+
+    Arguments:
+        path (str): Absolute path to file or directory
+
+    """
+
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+
+    return Entry(name=os.path.basename(path),
+                 path=path,
+                 isdir=stat.S_ISDIR(st.st_mode),
+                 size=st.st_size,
+                 mtime=st.st_mtime,
+                 inode=st.st_ino)
+
+
+def _iterate_fallback(path):
+    """Listing without scandir; one stat per entry"""
+    for name in os.listdir(path):
+        if name.startswith('.'):
+            continue
+
+        item = entry(os.path.join(path, name))
+        if item is not None:
+            yield item
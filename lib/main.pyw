@@ -4,12 +4,29 @@ Usage:
     From a command shell
 
     $ main.pyw path=/my/path
+    $ main.pyw path=/my/local /my/nas /my/archive
     $ main.pyw path=/my/path --port=5555
+    $ main.pyw path=/my/path --sync
+    $ main.pyw path=/my/path --no-cache
+    $ main.pyw path=/my/path --no-watch
+    $ main.pyw path=/my/path --no-prefetch
+    $ main.pyw path=/my/path --compact
+    $ main.pyw path=/my/path --virtual
+    $ main.pyw path=/my/path --thumbnails
+    $ main.pyw path=/my/path --no-search
+    $ main.pyw path=/my/path --no-tags
+    $ main.pyw path=/my/path --no-session
+    $ main.pyw path=/my/path --stats=60
+    $ main.pyw path=/my/path --stats=60 --stats-path=stats.json
+    $ main.pyw path=/my/path --startup-report
 
 """
 
 
 if __name__ == '__main__':
+    # Imported first, to time startup from launch
+    import lib.startup
+
     import logging
     log = logging.getLogger('lib')
 
@@ -27,13 +44,57 @@ if __name__ == '__main__':
 
     import argparse
     parser = argparse.ArgumentParser()
-    parser.add_argument('path')
+    parser.add_argument('path', nargs='+',
+                        help="Library root, or roots merged into one")
     parser.add_argument('--port', default=None)
     parser.add_argument('--support', default=list(), nargs='*')
+    parser.add_argument('--sync', action='store_true',
+                        help="List directories on the GUI thread")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="Do not use the persistent listing cache")
+    parser.add_argument('--no-watch', action='store_true',
+                        help="Do not watch directories for changes")
+    parser.add_argument('--no-prefetch', action='store_true',
+                        help="Do not list likely-next directories ahead")
+    parser.add_argument('--compact', action='store_true',
+                        help="Store items compactly, for very large trees")
+    parser.add_argument('--virtual', action='store_true',
+                        help="Only create delegates for visible rows")
+    parser.add_argument('--thumbnails', action='store_true',
+                        help="Display thumbnails, in virtualised columns")
+    parser.add_argument('--no-search', action='store_true',
+                        help="Do not index the library for searching")
+    parser.add_argument('--no-tags', action='store_true',
+                        help="Do not read or write tags and categories")
+    parser.add_argument('--no-session', action='store_true',
+                        help="Do not restore, or keep, tabs and bookmarks")
+    parser.add_argument('--stats', type=float, default=None,
+                        help="Report timings every number of seconds")
+    parser.add_argument('--stats-path', default=None,
+                        help="Write timings to this file as JSON, "
+                             "rather than log them")
+    parser.add_argument('--startup-report', action='store_true',
+                        help="Log startup timings, and slowest imports")
 
     args = parser.parse_args()
 
-    from lib import presentation
-    presentation.main(path=args.path,
-                      port=args.port,
-                      support=args.support)
+    if args.startup_report:
+        lib.startup.profile_imports()
+
+    import lib.presentation
+    lib.presentation.main(path=args.path,
+                          port=args.port,
+                          support=args.support,
+                          asynchronous=not args.sync,
+                          cache=not args.no_cache,
+                          watch=not args.no_watch,
+                          prefetch=not args.no_prefetch,
+                          compact=args.compact,
+                          virtual=args.virtual,
+                          search=not args.no_search,
+                          tags=not args.no_tags,
+                          stats=args.stats,
+                          stats_path=args.stats_path,
+                          session=not args.no_session,
+                          thumbnails=args.thumbnails,
+                          report=args.startup_report)
@@ -1,6 +1,10 @@
 
 # standard library
 import os
+import re
+import time
+import itertools
+import collections
 
 # pigui library
 import pifou.com
@@ -9,6 +13,18 @@ import pifou.domain.version
 # pigui library
 import pigui.pyqt5.model
 
+# pifou dependencies
+from PyQt5 import QtCore
+
+# local library
+import lib.pool
+import lib.index
+import lib.stats
+import lib.store
+import lib.listing
+import lib.watcher
+import lib.prefetch
+
 # Keys
 VERSION = 'version'
 DISPLAY = 'display'
@@ -18,19 +34,31 @@ COMMAND = 'command'
 SORTKEY = 'sortkey'
 PARENT = 'parent'
 SOURCE = 'source'
+SIZE = 'size'
+MTIME = 'mtime'
+TAGS = 'tags'
+CATEGORY = 'category'
+ROOT = 'root'
+ROOTS = 'roots'
 
 # Values
 GROUP = 'group'
+IMPORT = 'import'
 FILE = 'file'
 DISK = 'disk'
+LOADING = 'loading'
 
+# Separates the parent index and name of virtual commands
+COMMAND_SEPARATOR = '::'
 
-class Iterator(pifou.com.Iterator):
-    def __init__(self, *args, **kwargs):
-        super(Iterator, self).__init__(*args, **kwargs)
+# Sort modes
+NAME = 'name'
+MODIFIED = 'modified'
+LARGEST = 'largest'
+SORT_MODES = (NAME, MODIFIED, LARGEST)
 
-        if not self.filter:
-            self.filter = pifou.com.default_filter
+# Items of each type are listed after those of the previous
+SORT_RANKS = {DISK: 0, VERSION: 1, COMMAND: 2, LOADING: 3}
 
 
 class Item(pigui.pyqt5.model.ModelItem):
@@ -48,12 +76,18 @@ class Item(pigui.pyqt5.model.ModelItem):
     """
 
     def data(self, key):
-        """Intercept queries custom to Dash"""
+        """Intercept queries custom to Dash
+
+        Items created by :meth:`Model.pull` carry their display and
+        group up-front; the disk is only queried for items created
+        without them, such as the root.
+
+        """
 
         value = super(Item, self).data(key)
 
-        if not value and self.data(TYPE) in (pigui.pyqt5.model.Disk,
-                                             VERSION):
+        if value is None and self.data(TYPE) in (pigui.pyqt5.model.Disk,
+                                                 VERSION):
             if key == DISPLAY:
                 path = self.data(PATH)
                 display = os.path.basename(path)
@@ -62,26 +96,459 @@ class Item(pigui.pyqt5.model.ModelItem):
 
             if key == GROUP:
                 path = self.data(PATH)
-                isgroup = os.path.isdir(path)
+                with lib.stats.timer('item.data.disk'):
+                    isgroup = os.path.isdir(path)
                 self.set_data(GROUP, isgroup)
                 return isgroup
 
         return value
 
 
+# Data of compact items, never written to; their data is held in store
+EMPTY = dict()
+
+
+class CompactItem(Item):
+    """Item whose data is held in a :class:`lib.store.Store`
+
+    Display names equal to the basename of the path are derived
+    upon request, rather than stored.
+
+    The store is held by the class, rather than by each item;
+    see :func:`compact_class`.
+
+    Arguments:
+        row (int): Row of this item in `store`
+
+    """
+
+    store = None
+
+    def __init__(self, row, parent=None):
+        super(CompactItem, self).__init__(EMPTY, parent=parent)
+        self.row = row
+
+    def data(self, key):
+        value = self.store.get(self.row, key)
+
+        if value is None and self.data(TYPE) in (pigui.pyqt5.model.Disk,
+                                                 VERSION):
+            if key == DISPLAY:
+                return os.path.basename(self.data(PATH))
+
+            if key == GROUP:
+                with lib.stats.timer('item.data.disk'):
+                    isgroup = os.path.isdir(self.data(PATH))
+                self.set_data(GROUP, isgroup)
+                return isgroup
+
+        return value
+
+    def set_data(self, key, value):
+        if key == DISPLAY and value == os.path.basename(
+                self.data(PATH) or ''):
+            value = None
+
+        self.store.set(self.row, key, value)
+
+
+def compact_class(store):
+    """Return subclass of CompactItem whose data is held in `store`"""
+    return type('CompactItem', (CompactItem,), {'store': store})
+
+
+def create_store():
+    """Return store declaring the keys of Lib items"""
+    return lib.store.Store(codes={TYPE: (DISK, VERSION, COMMAND, LOADING)},
+                           strings=(SORTKEY, COMMAND, SOURCE, PARENT,
+                                    CATEGORY, ROOT),
+                           numbers=(SIZE, MTIME),
+                           flags=(GROUP,),
+                           paths=(PATH,))
+
+
+def entry_data(entry, typ):
+    """Return item-data for listing `entry` of type `typ`
+
+    Arguments:
+        entry (lib.listing.Entry): Listed file or directory
+        typ (str): Item type, e.g. DISK or VERSION
+
+    """
+
+    return {TYPE: typ,
+            PATH: entry.path,
+            DISPLAY: entry.name,
+            GROUP: entry.isdir,
+            SIZE: entry.size,
+            MTIME: entry.mtime}
+
+
+def merged(item):
+    """Return whether `item` is listed in more than one root"""
+    return len(item.data(ROOTS) or ()) > 1
+
+
+def included(name):
+    """Return whether `name` passes the default filter of pifou"""
+    default = pifou.com.default_filter
+    return default is None or bool(default(name))
+
+
+def children(path):
+    """Yield item-data for the files, folders and versions in `path`
+
+    Names excluded by the default filter of pifou are skipped.
+
+    Note:
+        Versions are found by :func:`pifou.domain.version.ls`, which
+        lists `path` a second time.
+
+    Arguments:
+        path (str): Absolute path to directory
+
+    Raises:
+        OSError if `path` could not be listed; versions are
+            yielded regardless.
+
+    """
+
+    by_name = dict()
+    error = None
+
+    try:
+        for entry in lib.listing.iterate(path):
+            if not included(entry.name):
+                continue
+
+            by_name[entry.name] = entry
+            yield entry_data(entry, DISK)
+    except OSError as e:
+        error = e
+
+    # Append versions, re-using the listing where possible
+    with lib.stats.timer('version.ls'):
+        versions = pifou.domain.version.ls(path)
+
+    for version in versions:
+        full_path = os.path.join(path, version)
+        entry = (by_name.get(version) or
+                 lib.listing.entry(full_path))
+
+        data = {TYPE: VERSION,
+                PATH: full_path,
+                SORTKEY: '|'}
+        if entry is not None:
+            data.update(entry_data(entry, VERSION))
+
+        yield data
+
+    if error is not None:
+        raise error
+
+
+def natural_key(name):
+    """Return key sorting numbers within `name` by value
+
+    Example:
+        >>> sorted(['v010', 'v2', 'v001'], key=natural_key)
+        ['v001', 'v2', 'v010']
+
+    """
+
+    parts = re.split(r'(\d+)', name.lower())
+    parts[1::2] = [int(part) for part in parts[1::2]]
+    return parts, name
+
+
+def command_index(parent, command):
+    """Return virtual index of `command` operating on `parent`"""
+    return parent + COMMAND_SEPARATOR + command
+
+
+def split_command(index):
+    """Return (parent, command) of virtual command `index`
+
+    Returns:
+        Tuple of parent index and command name, or None if
+        `index` is not a virtual command.
+
+    """
+
+    if COMMAND_SEPARATOR not in index:
+        return None
+
+    return tuple(index.rsplit(COMMAND_SEPARATOR, 1))
+
+
+def within(path, directory):
+    """Return whether `path` is, or is located under, `directory`"""
+    return (path + os.sep).startswith(directory + os.sep)
+
+
 class Model(pigui.pyqt5.model.Model):
+    """Lib model
+
+    Arguments:
+        asynchronous (bool): List directories in a background
+            thread and stream items in as they are found,
+            see :meth:`pull_async`
+        cache (lib.cache.Cache): Serve unmodified directories from
+            this persistent listing cache, see :meth:`iter_children`
+        watch (bool): Keep pulled directories up to date with
+            changes on disk, see :meth:`on_changed_on_disk`
+        prefetch (bool): List directories likely to be pulled next
+            in the background, see :meth:`prefetch`
+        compact (bool): Hold item-data in columns of a single
+            :class:`lib.store.Store`, rather than per item
+        tags (lib.tags.Tags): Tags and categories of items, read
+            per pulled column, see :meth:`annotate`
+        support (tuple): File-extensions to offer commands for, or
+            every file if empty
+
+    Attributes:
+        names (lib.index.NameIndex): Display names of every loaded
+            file, folder and version, or None until first filtered;
+            see :meth:`filter`
+
+    Signals:
+        batch_pulled (str, int, list, bool): Item-data listed in the
+            background; index, pull id, data and whether it was the
+            last batch.
+        changed_on_disk (lib.watcher.Change): A pulled directory
+            was modified
+        pulled (str): Children of index have changed, see :meth:`notify`
+
+    """
+
+    batch_pulled = QtCore.pyqtSignal(object, int, object, bool)
+    changed_on_disk = QtCore.pyqtSignal(object)
+    pulled = QtCore.pyqtSignal(object)
+
+    # Items streamed to the GUI thread at a time
+    batch_size = 200
+
+    def __init__(self, *args, **kwargs):
+        asynchronous = kwargs.pop('asynchronous', False)
+        cache = kwargs.pop('cache', None)
+        watch = kwargs.pop('watch', False)
+        prefetch = kwargs.pop('prefetch', False)
+        compact = kwargs.pop('compact', False)
+        tags = kwargs.pop('tags', None)
+        support = kwargs.pop('support', tuple())
+        super(Model, self).__init__(*args, **kwargs)
+
+        self.support = tuple(ext.lower() for ext in support)
+
+        self.store = create_store() if compact else None
+        self.compact_class = compact_class(self.store) if compact else None
+
+        self.names = None  # Built upon first filtering
+        self.query = None
+        self.matches = set()  # Indexes matching query
+        self.ancestors = set()  # Indexes leading up to matches
+        self.expanded = set()  # Pulled indexes, refreshed upon filtering
+
+        # Indexes holding only some children, created by :meth:`reveal`
+        # or by a cancelled pull
+        self.partial = set()
+
+        # Roots merged by relative path, see :meth:`setup`
+        self.roots = list()
+        self.current = None  # Most recently pulled index
+        self.merged = dict()  # {index: {(type, name): Item}}, whilst pulled
+
+        self.sort_mode = NAME
+        # Keys and order of the children of sorted indexes, see sort
+        self.sort_keys = dict()  # {index: {child index: key}}
+        self.orders = dict()  # {index: [child index, ..]}, in sort_mode
+        self.added = dict()  # {index: [child index, ..]}, since sorted
+
+        self.asynchronous = asynchronous
+        self.cache = cache
+        self.tags = tags
+        self.unannotated = set()  # Pulled whilst tags were being set
+        self.pool = None
+
+        # In-flight background pulls; {index: (pull_id, future, item)}
+        self.pulls = dict()
+        self.pull_ids = itertools.count()
+
+        # Watched directories; {path: index}
+        self.watched = dict()
+        self.watcher = None
+        if watch:
+            self.watcher = lib.watcher.create(
+                callback=self.changed_on_disk.emit)
+
+        self.prefetcher = None
+        if prefetch:
+            self.prefetcher = lib.prefetch.Prefetcher(self.iter_children)
+
+        self.batch_pulled.connect(self.on_batch_pulled,
+                                  QtCore.Qt.QueuedConnection)
+        self.changed_on_disk.connect(self.on_changed_on_disk,
+                                     QtCore.Qt.QueuedConnection)
+
     def setup(self, path):
+        """Present `path`, or multiple roots merged into one
+
+        Given multiple roots, children are merged by path relative
+        to their root; entries of earlier roots take precedence over
+        those of later roots, and each item carries its root under
+        ROOT and every root it exists in under ROOTS.
+
+        Multiple roots are always pulled in the background, with
+        each root listed concurrently, such that the entries of
+        fast roots are not held up by those of slow roots.
+
+        Arguments:
+            path (str or list): Absolute path, or paths, to root
+
+        """
+
+        roots = [path] if isinstance(path, basestring) else list(path)
+        self.roots = roots
+
         root = self.create_item({TYPE: DISK,
-                                 PATH: path})
+                                 PATH: roots[0],
+                                 ROOT: roots[0]})
         self.root_item = root
         self.model_reset.emit()
 
     def create_item(self, data, parent=None):
         assert isinstance(parent, basestring) or parent is None
-        item = Item(data, parent=self.indexes.get(parent))
+
+        name = data.get(DISPLAY) or os.path.basename(data.get(PATH) or '')
+
+        if self.store is not None:
+            data = dict(data)
+            display = data.pop(DISPLAY, None)
+
+            item = self.compact_class(self.store.add(data),
+                                      parent=self.indexes.get(parent))
+
+            if display is not None:
+                item.set_data(DISPLAY, display)
+        else:
+            item = Item(data, parent=self.indexes.get(parent))
+
         self.register_item(item)
+
+        # Merged into the existing order, once next sorted
+        if parent in self.orders:
+            self.added.setdefault(parent, list()).append(item.index)
+
+        if data.get(TYPE) in (DISK, VERSION):
+            if self.names is not None:
+                self.names.add(item.index, name)
+
+            if self.query and self.query in name.lower():
+                self.add_match(item)
+
         return item
 
+    def data(self, index, key):
+        """Return data of `index`, including virtual commands"""
+        command = split_command(index)
+        if command is not None:
+            return self.command_data(*command).get(key)
+
+        return super(Model, self).data(index, key)
+
+    def children(self, index):
+        """Return indexes of children, followed by virtual commands
+
+        Whilst filtering, children leading up to matches are returned;
+        every child is returned of matches and their descendants.
+
+        Virtual commands have no children.
+
+        """
+
+        if split_command(index) is not None:
+            return list()
+
+        children = self.orders.get(index)
+        added = self.added.pop(index, None)
+
+        if children is None:
+            children = self.sort(index, super(Model, self).children(index))
+            self.orders[index] = children
+
+        elif added:
+            children = self.insert_sorted(index, children, added)
+            self.orders[index] = children
+
+        if self.query and not self.matched(index):
+            children = [child for child in children
+                        if child in self.matches or child in self.ancestors]
+
+        return children + self.commands(index)
+
+    def commands(self, index):
+        """Return virtual indexes of commands operating on `index`
+
+        Commands are computed from the type of `index`, rather than
+        stored; versions may always be imported, and files if their
+        extension is supported.
+
+        Arguments:
+            index (str): Index of file or version
+
+        """
+
+        if split_command(index) is not None:
+            return list()
+
+        typ = self.data(index, TYPE)
+
+        if typ == VERSION:
+            return [command_index(index, IMPORT)]
+
+        if typ == DISK and self.data(index, GROUP) is False:
+            if self.support:
+                ext = os.path.splitext(self.data(index, PATH))[1]
+                if ext.lower() not in self.support:
+                    return list()
+
+            return [command_index(index, IMPORT)]
+
+        return list()
+
+    def command_data(self, parent, command):
+        """Return item-data of `command` operating on `parent`"""
+        isfile = self.data(parent, TYPE) == DISK
+
+        return {TYPE: COMMAND,
+                PATH: self.data(parent, PATH),
+                COMMAND: command,
+                SORTKEY: '{',
+                PARENT: parent,
+                SOURCE: FILE if isfile else VERSION}
+
+    def remove_item(self, item):
+        """Unregister `item` and its children, and detach from parent"""
+        for child in list(item.children):
+            self.remove_item(child)
+
+        self.indexes.pop(item.index, None)
+        if self.names is not None:
+            self.names.discard(item.index)
+        self.matches.discard(item.index)
+        self.expanded.discard(item.index)
+        self.orders.pop(item.index, None)
+        self.added.pop(item.index, None)
+        self.sort_keys.pop(item.index, None)
+
+        if isinstance(item, CompactItem):
+            item.store.release(item.row)
+
+        parent = item.parent
+        if parent is not None and item in parent.children:
+            parent.children.remove(item)
+            self.reorder(parent.index, item.index)
+
     def pull(self, index):
         """Pull data off of disk as per `index`
 
@@ -91,7 +558,8 @@ class Model(pigui.pyqt5.model.Model):
         Types:
             disk: Data is being are plain files/folders
             version: Data is the domain-object; VERSION
-            command: Buttons that operate on `version` and `disk` types
+            command: Buttons that operate on `version` and `disk` types,
+                these are virtual; see :meth:`commands`
 
         Item-data:
             type (str): Type of item
@@ -102,42 +570,1014 @@ class Model(pigui.pyqt5.model.Model):
 
         """
 
-        if self.data(index, TYPE) == DISK:
-            path = self.data(index, PATH)
+        with lib.stats.timer('model.pull'):
+            if split_command(index) is not None:
+                return  # Virtual commands have no children
+
+            self.current = index
+
+            if self.watcher is not None:
+                self.update_watched(index)
+
+            if self.prefetcher is not None:
+                path = self.data(index, PATH)
+                self.prefetcher.cancel(
+                    keep=lambda other: within(path, os.path.dirname(other)))
+
+            if self.data(index, TYPE) == DISK:
+                path = self.data(index, PATH)
+
+                if self.data(index, GROUP):
+                    self.expanded.add(index)
+
+                    locations = self.locations(index)
+
+                    if self.watcher is not None:
+                        for root, location in locations:
+                            self.watcher.watch(location)
+                            self.watched[location] = index
+
+                    if self.asynchronous or len(locations) > 1:
+                        return self.pull_async(index)
+
+                    listing = self.annotate(path, self.iter_children(path))
+
+                    try:
+                        self.create_children(index, listing)
+                    except OSError:
+                        self.status.emit("%s did not exist" % path)
+
+                    self.partial.discard(index)
+
+                    self.prefetch_children(index)
+
+            self.notify(index)
+
+    def create_children(self, index, listing):
+        """Create an item per item-data in `listing`, under `index`
+
+        Children already created by :meth:`reveal`, or streamed in
+        by a cancelled pull, are not duplicated.
+
+        """
+
+        existing = set()
+        if index in self.partial:
+            existing = set((child.data(TYPE), child.data(PATH))
+                           for child in self.indexes[index].children)
 
-            if self.data(index, GROUP):
-                if os.path.exists(path):
-                    for basename in Iterator(path):
-                        if basename.startswith('.'):
-                            continue
+        merged = self.merged.get(index)
+        created = 0
 
-                        full_path = os.path.join(path, basename)
-                        self.create_item({TYPE: DISK,
-                                          PATH: full_path}, parent=index)
+        with lib.stats.timer('model.create_children'):
+            for data in listing:
+                if (data.get(TYPE), data.get(PATH)) in existing:
+                    continue
+
+                if merged is None:
+                    self.create_item(data, parent=index)
+                    created += 1
+                    continue
+
+                key = (data.get(TYPE), os.path.basename(data[PATH]))
+                if key in merged:
+                    self.merge_item(merged[key], data)
                 else:
-                    self.status.emit("%s did not exist" % path)
-
-                # Append versions
-                for version in pifou.domain.version.ls(path):
-                    full_path = os.path.join(path, version)
-                    self.create_item({TYPE: VERSION,
-                                      PATH: full_path,
-                                      SORTKEY: '|'}, parent=index)
-
-        # Append commands to files and versions
-        isversion = self.data(index, TYPE) == VERSION
-        isfile = self.data(index, GROUP) is False
-
-        if isversion or isfile:
-            path = self.data(index, PATH)
-
-            for command in ('import',):
-                self.create_item({TYPE: COMMAND,
-                                  PATH: path,
-                                  COMMAND: command,
-                                  SORTKEY: '{',
-                                  PARENT: index,
-                                  SOURCE: FILE if isfile else VERSION},
-                                 parent=index)
+                    merged[key] = self.create_item(data, parent=index)
+                    created += 1
+
+        lib.stats.count('model.items', created)
+
+    def merge_item(self, item, data):
+        """Merge item-data `data` from another root into `item`"""
+        roots = item.data(ROOTS) or (item.data(ROOT),)
+        if data[ROOT] in roots:
+            return
+
+        roots = tuple(sorted(roots + (data[ROOT],), key=self.roots.index))
+        item.set_data(ROOTS, roots)
+
+        if roots[0] == data[ROOT]:
+            for key, value in data.items():
+                if key != TYPE:
+                    item.set_data(key, value)
+
+            self.update_sort_key(item)
+
+    def locations(self, index):
+        """Return (root, path) of directory `index` in every root
+
+        Returns:
+            List of (root, path) in order of precedence; root is
+                None unless multiple roots are merged
+
+        """
+
+        path = self.data(index, PATH)
+
+        if len(self.roots) < 2:
+            return [(None, path)]
+
+        root = self.data(index, ROOT) or self.roots[0]
+        relative = os.path.relpath(path, root)
+
+        return [(other, os.path.normpath(os.path.join(other, relative)))
+                for other in self.roots]
+
+    def iter_children(self, path):
+        """Yield item-data of the children of `path`
+
+        Directories unmodified since last being listed are served
+        from :attr:`prefetcher` or :attr:`cache`, without being
+        listed again.
+
+        Raises:
+            OSError if `path` could not be listed
+
+        """
+
+        if self.prefetcher is not None:
+            listing = self.prefetcher.take(path)
+            if listing is not None:
+                for data in listing:
+                    yield data
+                return
+
+        if self.cache is None:
+            for data in children(path):
+                yield data
+            return
+
+        listing = self.cache.get(path)
+        if listing is not None:
+            for data in listing:
+                yield data
+            return
+
+        # Modifications made during listing invalidate the listing
+        mtime = os.stat(path).st_mtime
+
+        listing = list()
+        for data in children(path):
+            listing.append(data)
+            yield data
+
+        self.cache.put(path, mtime, listing)
+
+    def set_tags(self, tags):
+        """Read tags and categories from `tags`, from now on
+
+        Columns pulled already are annotated in place, as are
+        those still being pulled once finished.
+
+        Arguments:
+            tags (lib.tags.Tags): Tags and categories of items
+
+        """
+
+        self.tags = tags
+        self.unannotated.update(self.pulls)
+
+        for index in self.expanded:
+            if index not in self.unannotated:
+                self.annotate_column(index)
+
+    def annotate_column(self, index):
+        """Read tags and categories of the children of `index`
+
+        Metadata of each listed directory is read at once.
+
+        """
+
+        by_directory = dict()  # {directory: [Item, ..]}
+        for child in self.indexes[index].children:
+            if child.data(TYPE) in (DISK, VERSION):
+                directory = os.path.dirname(child.data(PATH))
+                by_directory.setdefault(directory, list()).append(child)
+
+        for directory, children in by_directory.items():
+            metadata = self.tags.column(directory)
+
+            for child in children:
+                name = os.path.basename(child.data(PATH))
+                if name in metadata:
+                    tags, category = metadata[name]
+                    child.set_data(TAGS, tags)
+                    child.set_data(CATEGORY, category)
+
+        self.notify(index)
+
+    def annotate(self, path, listing):
+        """Yield item-data of `listing` along with tags and category
+
+        Metadata of every child of `path` is read at once, rather
+        than per child.
+
+        """
+
+        if self.tags is None:
+            for data in listing:
+                yield data
+            return
+
+        metadata = self.tags.column(path)
+
+        for data in listing:
+            name = os.path.basename(data[PATH])
+
+            if name in metadata:
+                tags, category = metadata[name]
+                data = dict(data)
+                data[TAGS] = tags
+                data[CATEGORY] = category
+
+            yield data
+
+    def pull_async(self, index):
+        """Pull directory at `index` from a background thread
+
+        A LOADING placeholder is appended to `index` until listing
+        has finished, whereafter items are created in batches of
+        :attr:`batch_size` on the GUI thread.
+
+        Pulls of directories outside of the path to `index` are
+        cancelled; the user has navigated away from them.
+
+        Arguments:
+            index (str): Index from which to pull
+
+        """
+
+        path = self.data(index, PATH)
+
+        for other in self.pulls.keys():
+            if not within(path, self.data(other, PATH)):
+                self.cancel_pull(other)
+
+        self.cancel_pull(index)
+
+        if self.pool is None:
+            self.pool = lib.pool.Pool(name='pull')
+
+        placeholder = self.create_item({TYPE: LOADING,
+                                        DISPLAY: 'Loading..',
+                                        SORTKEY: '~'}, parent=index)
+
+        pull_id = next(self.pull_ids)
+        locations = self.locations(index)
+
+        if len(locations) > 1:
+            self.merged[index] = dict(
+                ((child.data(TYPE), os.path.basename(child.data(PATH))),
+                 child) for child in self.indexes[index].children
+                if child.data(TYPE) in (DISK, VERSION))
+
+        # [pull id, futures, placeholder, unfinished listings]
+        futures = list()
+        self.pulls[index] = [pull_id, futures, placeholder, len(locations)]
+
+        # Registered prior to listing, which is otherwise cancelled
+        for root, location in locations:
+            futures.append(self.pool.submit(self.pull_worker,
+                                            index, location, pull_id, root))
+
+        self.notify(index)
+
+    def pull_worker(self, index, path, pull_id, root=None):
+        """List `path` and emit its item-data in batches
+
+        Runs in a worker thread; items are created by
+        :meth:`on_batch_pulled` on the GUI thread.
+
+        Arguments:
+            root (str): Root of `path`, stored with each item, when
+                merging multiple roots
+
+        """
+
+        batch = list()
+        started = time.time()
+
+        try:
+            for data in self.annotate(path, self.iter_children(path)):
+                if self.pulls.get(index, (None,))[0] != pull_id:
+                    return  # Cancelled
+
+                if root is not None:
+                    data = dict(data)
+                    data[ROOT] = root
+
+                batch.append(data)
+
+                if len(batch) >= self.batch_size:
+                    self.batch_pulled.emit(index, pull_id, batch, False)
+                    batch = list()
+
+        except OSError:
+            # Directories need not exist in every merged root
+            if root is None:
+                self.status.emit("%s did not exist" % path)
+
+        self.batch_pulled.emit(index, pull_id, batch, True)
+        lib.stats.record('model.pull_worker', time.time() - started)
+
+    def on_batch_pulled(self, index, pull_id, batch, done):
+        pull = self.pulls.get(index)
+        if pull is None or pull[0] != pull_id:
+            return  # Cancelled
+
+        with lib.stats.timer('model.on_batch_pulled'):
+            self.create_children(index, batch)
+
+        if done:
+            pull[3] -= 1
+
+        if done and not pull[3]:
+            self.pulls.pop(index)
+            self.merged.pop(index, None)
+            self.partial.discard(index)
+            self.remove_item(pull[2])
+            self.prefetch_children(index)
+
+            if index in self.unannotated:
+                self.unannotated.discard(index)
+                self.annotate_column(index)
+
+        self.notify(index)
+
+    def notify(self, index):
+        """Announce that children of `index` have changed
+
+        Views other than those of pigui, e.g. :class:`lib.view.VirtualList`,
+        are refreshed via :attr:`pulled`.
+
+        """
 
         super(Model, self).pull(index)
+        self.pulled.emit(index)
+
+    def cancel_pull(self, index):
+        """Cancel background pull of `index`, if any
+
+        Items already streamed in are kept, and are not duplicated
+        when `index` is pulled again, see :meth:`create_children`.
+
+        """
+
+        pull = self.pulls.pop(index, None)
+        if pull is None:
+            return
+
+        pull_id, futures, placeholder, unfinished = pull
+        for future in futures:
+            future.cancel()
+
+        self.merged.pop(index, None)
+        self.partial.add(index)
+        self.remove_item(placeholder)
+        self.status.emit("Cancelled listing of %s" % self.data(index, PATH))
+
+    def prefetch(self, index):
+        """List directory at `index` in the background, if any
+
+        A subsequent pull of `index` is served from memory.
+
+        """
+
+        if self.prefetcher is None:
+            return
+
+        if self.data(index, TYPE) == DISK and self.data(index, GROUP):
+            self.prefetcher.prefetch(self.data(index, PATH))
+
+    def prefetch_children(self, index):
+        """Prefetch the first directories of pulled `index`"""
+        if self.prefetcher is None:
+            return
+
+        self.prefetcher.schedule(
+            child.data(PATH) for child in self.indexes[index].children
+            if child.data(TYPE) == DISK and child.data(GROUP))
+
+    def update_watched(self, index):
+        """Stop watching directories outside of the path to `index`"""
+        path = self.data(index, PATH)
+
+        for directory in self.watched.keys():
+            if not within(path, directory):
+                self.watcher.unwatch(directory)
+                del self.watched[directory]
+
+    def on_changed_on_disk(self, change):
+        """Apply `change` to the children of its directory
+
+        Dirty names are compared against what is on disk; missing
+        entries are removed, new entries are inserted and existing
+        entries have their data refreshed. Renamed items are kept,
+        along with their children, and relocated in-place; along with
+        the watches of their pulled directories.
+
+        When merging multiple roots, only items of the root of the
+        modified directory are affected. Items also listed in other
+        roots are kept when removed or renamed, and only forget the
+        modified root, see :meth:`detach_root`; new entries are
+        merged into an entry of the same name from another root.
+
+        Arguments:
+            change (lib.watcher.Change): Modified directory
+
+        """
+
+        index = (self.watched.get(change.directory) or
+                 self.directory_index(change.directory))
+        if index is None or index not in self.indexes:
+            return
+
+        root = None
+        for other, location in self.locations(index):
+            if location == change.directory:
+                root = other
+
+        existing = dict()  # {basename: [Item, ..]}, of this root
+        others = dict()  # {basename: [Item, ..]}, of other roots only
+        for child in self.indexes[index].children:
+            if child.data(TYPE) in (DISK, VERSION):
+                directory, name = os.path.split(child.data(PATH))
+                if (directory == change.directory or
+                        root in (child.data(ROOTS) or ())):
+                    existing.setdefault(name, list()).append(child)
+                else:
+                    others.setdefault(name, list()).append(child)
+
+        names = set(name for name in change.names if included(name))
+
+        for old, new in change.renames:
+            if old not in existing or new in existing:
+                continue
+
+            entry = lib.listing.entry(os.path.join(change.directory, new))
+            if entry is None:
+                continue
+
+            items = existing.pop(old)
+            names.discard(old)
+
+            if any(merged(item) for item in items):
+                # Still listed under its old name in other roots;
+                # the new name is inserted, or merged, as any other
+                for item in items:
+                    self.detach_root(item, root)
+                continue
+
+            for item in items:
+                self.move_item(item, entry.path)
+                item.set_data(DISPLAY, entry.name)
+                if self.names is not None:
+                    self.names.add(item.index, entry.name)
+                self.update_sort_key(item)
+
+            self.move_watched(os.path.join(change.directory, old),
+                              entry.path)
+
+            names.discard(new)
+
+        versions = None
+
+        for name in names:
+            full_path = os.path.join(change.directory, name)
+            entry = lib.listing.entry(full_path)
+
+            if entry is None:
+                for item in existing.get(name, list()):
+                    self.detach_root(item, root)
+
+            elif name in existing:
+                for item in existing[name]:
+                    if merged(item) and item.data(ROOT) != root:
+                        continue  # Represented by another root
+
+                    for key, value in entry_data(entry, DISK).items():
+                        if key != TYPE:
+                            item.set_data(key, value)
+                    self.update_sort_key(item)
+
+            else:
+                if versions is None:
+                    versions = set(
+                        pifou.domain.version.ls(change.directory))
+
+                listed = [entry_data(entry, DISK)]
+                if name in versions:
+                    listed.append(entry_data(entry, VERSION))
+                    listed[-1][SORTKEY] = '|'
+
+                for data in listed:
+                    if root is not None:
+                        data[ROOT] = root
+
+                    for item in others.get(name, list()):
+                        if item.data(TYPE) == data[TYPE]:
+                            self.merge_item(item, data)
+                            break
+                    else:
+                        self.create_item(data, parent=index)
+
+        self.reorder(index)
+        self.notify(index)
+
+    def detach_root(self, item, root):
+        """Forget `item` in `root`, e.g. as it was removed there
+
+        Items merged from other roots are kept, along with their
+        descendants in those roots, and are represented by the next
+        root in order; other items are removed.
+
+        Arguments:
+            item (Item): Item of a file, folder or version
+            root (str): Root no longer holding `item`, or None
+                unless multiple roots are merged
+
+        """
+
+        roots = item.data(ROOTS) or (item.data(ROOT),)
+        if root not in roots:
+            return
+
+        remaining = tuple(other for other in roots if other != root)
+
+        if not remaining:
+            return self.remove_item(item)
+
+        for child in list(item.children):
+            if child.data(TYPE) in (DISK, VERSION):
+                self.detach_root(child, root)
+
+        relative = os.path.relpath(item.data(PATH), item.data(ROOT))
+
+        location = os.path.normpath(os.path.join(root, relative))
+        if self.watched.get(location) == item.index:
+            del self.watched[location]
+            if self.watcher is not None:
+                self.watcher.unwatch(location)
+
+        item.set_data(ROOTS, remaining)
+
+        if item.data(ROOT) == root:
+            path = os.path.normpath(os.path.join(remaining[0], relative))
+            entry = lib.listing.entry(path)
+
+            item.set_data(PATH, path)
+            item.set_data(ROOT, remaining[0])
+
+            if entry is not None:
+                for key, value in entry_data(entry, item.data(TYPE)).items():
+                    if key != TYPE:
+                        item.set_data(key, value)
+
+            self.update_sort_key(item)
+
+    def move_item(self, item, path):
+        """Relocate `item`, and every descendant, to `path`
+
+        Descendants from other merged roots are left untouched.
+
+        """
+
+        old = item.data(PATH)
+
+        for child in item.children:
+            child_path = child.data(PATH)
+            if child_path is not None and within(child_path, old):
+                self.move_item(child, path + child_path[len(old):])
+
+        item.set_data(PATH, path)
+
+    def move_watched(self, old, new):
+        """Watch directories under `old` at their new location `new`"""
+        for directory in self.watched.keys():
+            if not within(directory, old):
+                continue
+
+            index = self.watched.pop(directory)
+            self.watched[new + directory[len(old):]] = index
+
+            if self.watcher is not None:
+                self.watcher.unwatch(directory)
+                self.watcher.watch(new + directory[len(old):])
+
+    def filter(self, query):
+        """Only present items whose display name contains `query`
+
+        Items are looked up in :attr:`names`, such that filtering
+        never touches the disk; it is built upon first filtering and
+        kept up to date from then on, such that no memory is spent
+        on it unless used. Parents of matches remain visible, as do
+        the children of matches. Items loaded whilst filtering are
+        matched as they are created.
+
+        Arguments:
+            query (str): Case-insensitive substring, or empty to
+                present every item
+
+        """
+
+        query = query.lower() or None
+        if query == self.query:
+            return
+
+        self.query = query
+        self.matches.clear()
+        self.ancestors.clear()
+
+        if query is not None:
+            if self.names is None:
+                self.names = self.create_names()
+
+            for index in self.names.search(query):
+                self.add_match(self.indexes[index])
+
+        for index in self.expanded:
+            self.notify(index)
+
+    def create_names(self):
+        """Return index of the display names of every loaded item"""
+        names = lib.index.NameIndex()
+
+        for index, item in self.indexes.items():
+            if item.data(TYPE) in (DISK, VERSION):
+                names.add(index, item.data(DISPLAY) or
+                          os.path.basename(item.data(PATH) or ''))
+
+        return names
+
+    def add_match(self, item):
+        self.matches.add(item.index)
+
+        parent = item.parent
+        while parent is not None and parent.index not in self.ancestors:
+            self.ancestors.add(parent.index)
+            parent = parent.parent
+
+    def matched(self, index):
+        """Return whether `index`, or any of its parents, is a match"""
+        item = self.indexes.get(index)
+        while item is not None:
+            if item.index in self.matches:
+                return True
+            item = item.parent
+
+        return False
+
+    def reveal(self, path, typ=DISK):
+        """Return index of `path`, creating only the items leading to it
+
+        Directories between the root and `path` are not listed; each
+        is given only the child leading up to `path`, until pulled.
+
+        Arguments:
+            path (str): Absolute path beneath any root
+            typ (str): Type of item at `path`, DISK or VERSION
+
+        Returns:
+            Index of `path`, or None if it is not located beneath
+                a root or no longer exists
+
+        """
+
+        item = self.root_item
+
+        for root in self.roots:
+            if within(path, root):
+                break
+        else:
+            return None
+
+        relative = os.path.relpath(path, root)
+        parts = list() if relative == os.curdir else relative.split(os.sep)
+
+        for number, part in enumerate(parts):
+            child_type = typ if number == len(parts) - 1 else DISK
+
+            # Items of merged roots are matched by name alone
+            for child in item.children:
+                if (child.data(TYPE) == child_type and
+                        os.path.basename(child.data(PATH)) == part):
+                    break
+            else:
+                full_path = os.path.join(root, *parts[:number + 1])
+                entry = lib.listing.entry(full_path)
+                if entry is None:
+                    return None
+
+                data = entry_data(entry, child_type)
+                if child_type == VERSION:
+                    data[SORTKEY] = '|'
+                if len(self.roots) > 1:
+                    data[ROOT] = root
+
+                self.partial.add(item.index)
+                child = self.create_item(data, parent=item.index)
+                self.notify(item.index)
+
+            item = child
+
+        return item.index
+
+    def sort(self, index, children):
+        """Return `children` of `index` ordered by key in `sort_mode`
+
+        Types are ordered as per SORT_RANKS, whereafter items are
+        ordered by name, numbers by value, or by most recently
+        modified or largest first.
+
+        Keys are computed per child upon first being sorted, and
+        kept until the child changes, see :meth:`reorder`. Children
+        created since are inserted into the previous order, rather
+        than every child sorted anew, see :meth:`insert_sorted`.
+
+        """
+
+        keys = self.sort_keys.setdefault(index, dict())
+        for child in children:
+            if child not in keys:
+                keys[child] = self.sort_key(child)
+
+        return sorted(children, key=self.order_key(index))
+
+    def insert_sorted(self, index, children, added):
+        """Return ordered `children` of `index`, with `added` in order
+
+        Each of `added` is located by binary search, such that a
+        column streamed in batches computes the order of each child
+        only as it arrives.
+
+        """
+
+        key = self.order_key(index)
+        merged = list(children)
+        low = 0
+
+        for child in self.sort(index, added):
+            value = key(child)
+            high = len(merged)
+
+            while low < high:
+                middle = (low + high) // 2
+                if value < key(merged[middle]):
+                    high = middle
+                else:
+                    low = middle + 1
+
+            merged.insert(low, child)
+            low += 1
+
+        return merged
+
+    def order_key(self, index):
+        """Return function ordering children of `index` in `sort_mode`"""
+        keys = self.sort_keys[index]
+
+        if self.sort_mode == MODIFIED:
+            def key(index):
+                rank, natural, mtime, size = keys[index]
+                return rank, -mtime, natural
+
+        elif self.sort_mode == LARGEST:
+            def key(index):
+                rank, natural, mtime, size = keys[index]
+                return rank, -size, natural
+
+        else:
+            def key(index):
+                return keys[index][:2]
+
+        return key
+
+    def sort_key(self, index):
+        """Return (rank, natural, mtime, size) of `index`"""
+        item = self.indexes[index]
+        return (SORT_RANKS.get(item.data(TYPE), 0),
+                natural_key(item.data(DISPLAY) or ''),
+                item.data(MTIME) or 0,
+                item.data(SIZE) or 0)
+
+    def set_sort_mode(self, mode):
+        """Re-order every pulled index by `mode`, one of SORT_MODES
+
+        Cached keys are re-used; items and their data are untouched.
+
+        """
+
+        assert mode in SORT_MODES, "%s not in %s" % (mode, SORT_MODES)
+
+        if mode == self.sort_mode:
+            return
+
+        self.sort_mode = mode
+        self.orders.clear()
+        self.added.clear()
+
+        for index in self.expanded:
+            self.notify(index)
+
+    def reorder(self, index, child=None):
+        """Forget order of the children of `index`
+
+        Arguments:
+            index (str): Parent index
+            child (str): Forget also the sort key of this child,
+                e.g. as it was changed or removed
+
+        """
+
+        self.orders.pop(index, None)
+        self.added.pop(index, None)
+
+        if child is not None:
+            keys = self.sort_keys.get(index)
+            if keys is not None:
+                keys.pop(child, None)
+
+    def update_sort_key(self, item):
+        """Re-sort the column of `item` after its data has changed"""
+        if item.parent is not None:
+            self.reorder(item.parent.index, item.index)
+
+    def tag(self, indexes, tag):
+        """Tag every item of `indexes` with `tag`
+
+        Items are updated immediately, and written in a single batch.
+
+        """
+
+        items = [self.indexes[index] for index in indexes]
+
+        for item in items:
+            tags = set(item.data(TAGS) or ())
+            tags.add(tag)
+            item.set_data(TAGS, tuple(sorted(tags)))
+
+        self.tags.tag([item.data(PATH) for item in items], tag)
+
+    def untag(self, indexes, tag):
+        items = [self.indexes[index] for index in indexes]
+
+        for item in items:
+            tags = set(item.data(TAGS) or ())
+            tags.discard(tag)
+            item.set_data(TAGS, tuple(sorted(tags)) or None)
+
+        self.tags.untag([item.data(PATH) for item in items], tag)
+
+    def categorize(self, indexes, category):
+        """Place every item of `indexes` in `category`, or none if None"""
+        items = [self.indexes[index] for index in indexes]
+
+        for item in items:
+            item.set_data(CATEGORY, category)
+
+        self.tags.categorize([item.data(PATH) for item in items], category)
+
+    def directory_index(self, directory):
+        """Return pulled index listing `directory`, in any root"""
+        for index in self.expanded:
+            for root, location in self.locations(index):
+                if location == directory:
+                    return index
+
+        return None
+
+    def clear(self):
+        """Forget every item, and stop every pull and watch"""
+        for index in self.pulls.keys():
+            self.cancel_pull(index)
+
+        if self.watcher is not None:
+            for directory in self.watched:
+                self.watcher.unwatch(directory)
+        self.watched.clear()
+
+        if self.store is not None:
+            self.store = create_store()
+            self.compact_class = compact_class(self.store)
+
+        self.indexes.clear()
+        self.names = None
+        self.query = None
+        self.matches.clear()
+        self.ancestors.clear()
+        self.expanded.clear()
+        self.partial.clear()
+        self.merged.clear()
+        self.sort_keys.clear()
+        self.orders.clear()
+        self.added.clear()
+        self.unannotated.clear()
+        self.root_item = None
+        self.current = None
+
+    def snapshot(self):
+        """Return JSON-serialisable state of pulled directories
+
+        Only the paths of pulled directories are stored, along with
+        that pulled most recently; their children are listed anew
+        once restored, see :meth:`restore`.
+
+        """
+
+        current = None
+        if self.current in self.indexes:
+            current = [self.data(self.current, PATH),
+                       self.data(self.current, TYPE)]
+
+        return {'roots': self.roots,
+                'expanded': sorted(self.data(index, PATH)
+                                   for index in self.expanded),
+                'current': current}
+
+    def restore(self, snapshot):
+        """Replace every item with the directories of `snapshot`
+
+        Each pulled directory is revealed, see :meth:`reveal`, and
+        its remaining children listed in the background, as though
+        reported by the watcher; see :meth:`revalidate`.
+
+        Returns:
+            Index most recently pulled at the time of the snapshot,
+                or None if it no longer exists
+
+        """
+
+        self.clear()
+        self.setup(snapshot['roots'])
+
+        # Parents first, such that each is revealed once
+        for path in sorted(snapshot['expanded'], key=len):
+            index = self.reveal(path)
+            if index is not None and self.data(index, GROUP):
+                self.expanded.add(index)
+
+        if self.watcher is not None:
+            for index in self.expanded:
+                for root, location in self.locations(index):
+                    self.watcher.watch(location)
+                    self.watched[location] = index
+
+        self.model_reset.emit()
+        self.revalidate()
+
+        if snapshot.get('current') is not None:
+            path, typ = snapshot['current']
+            self.current = self.reveal(path, typ)
+
+        return self.current
+
+    def revalidate(self):
+        """Compare pulled directories against the disk, in the background
+
+        Differences are applied as though they were reported by the
+        watcher, via :meth:`on_changed_on_disk`.
+
+        """
+
+        if self.pool is None:
+            self.pool = lib.pool.Pool(name='pull')
+
+        for index in self.expanded:
+            children = dict()  # {path: (isdir, size, mtime)}
+            for child in self.indexes[index].children:
+                if child.data(TYPE) == DISK:
+                    children[child.data(PATH)] = (child.data(GROUP),
+                                                  child.data(SIZE),
+                                                  child.data(MTIME))
+
+            for root, location in self.locations(index):
+                self.pool.submit(self.revalidate_worker, location, children)
+
+    def revalidate_worker(self, directory, children):
+        try:
+            entries = lib.listing.ls(directory)
+        except OSError:
+            entries = list()
+
+        names = set()
+        listed = set()
+
+        for entry in entries:
+            if not included(entry.name):
+                continue
+
+            listed.add(entry.path)
+            if children.get(entry.path) != (entry.isdir,
+                                            entry.size,
+                                            entry.mtime):
+                names.add(entry.name)
+
+        for path in children:
+            parent, name = os.path.split(path)
+            if parent == directory and path not in listed:
+                names.add(name)
+
+        if names:
+            self.changed_on_disk.emit(
+                lib.watcher.Change(directory, names, list()))
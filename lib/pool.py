@@ -0,0 +1,145 @@
+"""Thread-pool used for work kept off of the GUI thread
+
+ ______________
+|              |
+|  submit -->  |-----> worker_0 ---> future
+|              |-----> worker_1 ---> future
+|______________|-----> worker_n ---> future
+
+"""
+
+# standard library
+import logging
+import threading
+import Queue as queue
+
+log = logging.getLogger('lib.pool')
+
+
+class Future(object):
+    """Result of a call submitted to a :class:`Pool`
+
+    Cancelling a future that has not yet started prevents it
+    from running; a running call is left to finish, and may poll
+    :meth:`cancelled` to exit early.
+
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._cancelled = False
+        self._running = False
+        self._result = None
+        self._exception = None
+        self._callbacks = list()
+
+    def cancel(self):
+        with self._lock:
+            if self._event.is_set():
+                return False
+            self._cancelled = True
+        return True
+
+    def cancelled(self):
+        return self._cancelled
+
+    def done(self):
+        return self._event.is_set()
+
+    def result(self, timeout=None):
+        """Block until finished and return result, or re-raise"""
+        if not self._event.wait(timeout):
+            raise RuntimeError("Timed out waiting on result")
+
+        if self._exception is not None:
+            raise self._exception
+
+        return self._result
+
+    def exception(self, timeout=None):
+        self._event.wait(timeout)
+        return self._exception
+
+    def add_done_callback(self, func):
+        """Call `func(future)` when finished, from the worker thread"""
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(func)
+                return
+        func(self)
+
+    def _start(self):
+        with self._lock:
+            if self._cancelled:
+                self._finish()
+                return False
+            self._running = True
+        return True
+
+    def _set_result(self, result):
+        self._result = result
+        self._finish()
+
+    def _set_exception(self, exception):
+        self._exception = exception
+        self._finish()
+
+    def _finish(self):
+        self._event.set()
+        for func in self._callbacks:
+            try:
+                func(self)
+            except Exception:
+                log.exception("Callback %r failed" % func)
+
+
+class Pool(object):
+    """Fixed number of daemon worker threads
+
+    Arguments:
+        workers (int): Number of threads
+        name (str): Prefix of thread names
+
+    """
+
+    def __init__(self, workers=4, name='pool'):
+        self.queue = queue.Queue()
+        self.threads = list()
+
+        for number in range(workers):
+            thread = threading.Thread(target=self.worker,
+                                      name='%s_%i' % (name, number))
+            thread.daemon = True
+            thread.start()
+            self.threads.append(thread)
+
+    def submit(self, func, *args, **kwargs):
+        """Call `func` with `args` and `kwargs` in a worker thread
+
+        Returns:
+            Future
+
+        """
+
+        future = Future()
+        self.queue.put((future, func, args, kwargs))
+        return future
+
+    def map(self, func, iterable):
+        """Call `func` per item in parallel, returning results in order"""
+        futures = [self.submit(func, item) for item in iterable]
+        return [future.result() for future in futures]
+
+    def worker(self):
+        while True:
+            future, func, args, kwargs = self.queue.get(block=True)
+
+            if future._start():
+                try:
+                    future._set_result(func(*args, **kwargs))
+                except Exception as e:
+                    log.exception("%r failed" % func)
+                    future._set_exception(e)
+
+            self.queue.task_done()
@@ -0,0 +1,109 @@
+"""Speculative listing of directories likely to be visited next
+
+Once a column has been populated, its first few directories are
+listed in the background, along with any directory being hovered
+or focused. Pulling a prefetched directory is then served from
+memory, provided it has not been modified since.
+
+"""
+
+# standard library
+import os
+import logging
+import threading
+import collections
+
+# local library
+import lib.pool
+
+log = logging.getLogger('lib.prefetch')
+
+
+class Prefetcher(object):
+    """Bounded background listing of directories
+
+    Arguments:
+        func (callable): Return iterable of item-data for a path
+        workers (int): Maximum concurrent listings
+        per_column (int): Maximum directories prefetched per column
+        budget (int): Maximum listings held in memory; the least
+            recently prefetched are discarded first
+
+    """
+
+    def __init__(self, func, workers=2, per_column=5, budget=64):
+        self.func = func
+        self.per_column = per_column
+        self.budget = budget
+
+        self.pool = lib.pool.Pool(workers, name='prefetch')
+        self.lock = threading.Lock()
+
+        # {path: (mtime, listing)}, in order of prefetching
+        self.listings = collections.OrderedDict()
+        self.pending = dict()  # {path: Future}
+
+    def schedule(self, paths):
+        """Prefetch up to `per_column` of `paths`, in order"""
+        for path in list(paths)[:self.per_column]:
+            self.prefetch(path)
+
+    def prefetch(self, path):
+        with self.lock:
+            if path in self.listings or path in self.pending:
+                return
+
+            self.pending[path] = self.pool.submit(self.fetch, path)
+
+    def cancel(self, keep):
+        """Cancel pending prefetches for which `keep(path)` is False"""
+        with self.lock:
+            for path, future in self.pending.items():
+                if not keep(path):
+                    future.cancel()
+                    del self.pending[path]
+
+    def take(self, path):
+        """Return and forget prefetched listing of `path`, or None
+
+        None is returned if `path` has not been prefetched, or if
+        it has been modified since.
+
+        """
+
+        with self.lock:
+            prefetched = self.listings.pop(path, None)
+
+        if prefetched is None:
+            return None
+
+        mtime, listing = prefetched
+
+        try:
+            if os.stat(path).st_mtime != mtime:
+                return None
+        except OSError:
+            return None
+
+        return listing
+
+    def fetch(self, path):
+        try:
+            mtime = os.stat(path).st_mtime
+            listing = list(self.func(path))
+        except OSError:
+            listing = None
+
+        with self.lock:
+            if self.pending.pop(path, None) is None:
+                return  # Cancelled
+
+            if listing is None:
+                return
+
+            self.listings[path] = (mtime, listing)
+
+            while len(self.listings) > self.budget:
+                self.listings.popitem(last=False)
+
+        log.debug("Prefetched %s" % path)
@@ -1,27 +1,122 @@
 # from __future__ import absolute_import
 
+import lib.view
 import lib.controller
-import lib.application
 
 
-def main(path, port=None, support=tuple()):
+def main(path,
+         port=None,
+         support=tuple(),
+         asynchronous=True,
+         cache=True,
+         watch=True,
+         prefetch=True,
+         compact=False,
+         virtual=False,
+         search=True,
+         tags=True,
+         stats=None,
+         stats_path=None,
+         session=True,
+         thumbnails=False,
+         report=False):
+    """Run Lib
+
+    The first column is shown before the application, search and
+    statistics are loaded; each is imported only once needed.
+
+    Arguments:
+        path (str or list): Absolute path to library root, or
+            multiple roots merged into one, see
+            :meth:`lib.model.Model.setup`
+        thumbnails (bool): Display thumbnails of files and versions,
+            in virtualised columns
+        report (bool): Log startup timings once ready,
+            see :mod:`lib.startup`
+
+    """
+
+    import logging
     import pigui.pyqt5.util
+    import lib.startup
+
+    from PyQt5 import QtWidgets
+
+    lib.startup.mark('imports')
 
-    application = lib.application.Lib(port, support)
+    roots = [path] if isinstance(path, basestring) else list(path)
+
+    if virtual or thumbnails:
+        lib.view.enable_virtual()
+
+    if thumbnails:
+        import lib.thumbnail
+        lib.view.enable_thumbnails(
+            lib.thumbnail.Thumbnails(lib.settings.THUMBNAIL_PATH,
+                                     lib.settings.THUMBNAIL_SIZE,
+                                     lib.settings.THUMBNAIL_WORKERS,
+                                     lib.settings.THUMBNAIL_MEMORY))
 
     with pigui.pyqt5.util.application_context():
         controller = lib.controller.Lib(support)
 
-        model = lib.model.Model()
-        controller.set_model(model)
-        application.set_model(model)
+        listing_cache = None
+        if cache:
+            import lib.cache
+            listing_cache = lib.cache.Cache(lib.settings.CACHE_PATH,
+                                            lib.settings.CACHE_SIZE)
 
-        application.set_controller(controller)
+        model = lib.model.Model(asynchronous=asynchronous,
+                                cache=listing_cache,
+                                watch=watch,
+                                prefetch=prefetch,
+                                compact=compact,
+                                support=support)
+        controller.set_model(model)
 
         controller.resize(*lib.settings.WINDOW_SIZE)
         controller.animated_show()
 
-        model.setup(path)
+        model.setup(roots)
+
+        if session:
+            import lib.session
+            controller.set_session(
+                lib.session.Session(lib.settings.SESSION_PATH))
+
+        # Paint the first column, before loading the remainder
+        QtWidgets.QApplication.processEvents()
+        lib.startup.mark('first_column')
+
+        if tags:
+            import sqlite3
+            import lib.tags
+            try:
+                model.set_tags(lib.tags.Tags(roots[0], roots))
+            except sqlite3.Error as e:
+                logging.getLogger('lib').warning(
+                    "Tags not available at %s: %s" % (roots[0], e))
+
+        import lib.application
+        application = lib.application.Lib(port, support)
+        application.set_model(model)
+        application.set_controller(controller)
+
+        if stats:
+            lib.stats.Reporter(interval=stats, path=stats_path)
+
+        if search:
+            import lib.search
+            index = lib.search.Index(lib.settings.SEARCH_PATH,
+                                     lib.settings.SEARCH_WORKERS)
+            for root in roots:
+                index.crawl(root)
+            controller.set_search(index)
+
+        lib.startup.mark('ready')
+
+        if report:
+            lib.startup.report()
 
 
 if __name__ == '__main__':
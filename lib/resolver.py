@@ -0,0 +1,102 @@
+"""Discovery of the importable file of domain-versions
+
+A version is importable if it contains exactly one file of a
+supported extension. Resolved files are cached per version, for as
+long as the mtime of the version remains unchanged.
+
+Usage:
+    >>> resolver = Resolver(support=('.ma',))
+    >>> resolver.resolve('/jobs/hero/v001')
+    '/jobs/hero/v001/hero.ma'
+
+"""
+
+# standard library
+import os
+import threading
+
+# local library
+import lib.pool
+import lib.listing
+
+
+class ResolveError(Exception):
+    """A version could not be resolved into a file"""
+
+
+class Resolver(object):
+    """Cached, parallel resolution of versions into files
+
+    Arguments:
+        support (tuple): Supported file-extensions, e.g. ('.ma',)
+        workers (int): Maximum versions resolved at once
+
+    """
+
+    def __init__(self, support=tuple(), workers=4):
+        self.support = tuple(ext.lower() for ext in support)
+        self.workers = workers
+        self.pool = None
+
+        self.lock = threading.Lock()
+        self.resolved = dict()  # {version: (mtime, file)}
+
+    def resolve(self, path):
+        """Return absolute path to the importable file of `path`
+
+        Raises:
+            ResolveError if `path` is not a directory, or does not
+                contain exactly one supported file
+
+        """
+
+        try:
+            mtime = os.stat(path).st_mtime
+        except OSError:
+            raise ResolveError("{} does not exist".format(path))
+
+        with self.lock:
+            cached = self.resolved.get(path)
+
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+
+        try:
+            entries = lib.listing.ls(path)
+        except OSError:
+            raise ResolveError("{} is not a directory".format(path))
+
+        supported_files = [
+            entry.path for entry in entries if not entry.isdir and
+            os.path.splitext(entry.name)[1].lower() in self.support]
+
+        if not supported_files:
+            raise ResolveError("No supported files found")
+
+        if len(supported_files) > 1:
+            raise ResolveError("Multiple supported files found")
+
+        with self.lock:
+            self.resolved[path] = (mtime, supported_files[0])
+
+        return supported_files[0]
+
+    def resolve_async(self, paths):
+        """Resolve each of `paths` in parallel, in the background
+
+        Returns:
+            List of :class:`lib.pool.Future` per path, in order, each
+                of (path, file, error); either `file` or `error` is None
+
+        """
+
+        if self.pool is None:
+            self.pool = lib.pool.Pool(self.workers, name='resolve')
+
+        return [self.pool.submit(self._resolve, path) for path in paths]
+
+    def _resolve(self, path):
+        try:
+            return path, self.resolve(path), None
+        except ResolveError as e:
+            return path, None, e
@@ -0,0 +1,302 @@
+"""Persistent index of every path beneath a library root
+
+The root is crawled in the background, by a bounded number of
+threads, and each file, folder and version is recorded along with
+its extension. Directories unmodified since the previous crawl are
+not listed again; only descended into.
+
+ ____________________________________________________
+|                                                    |
+| path            | directory | name | ext | type    |
+|-----------------|-----------|------|-----|---------|
+| /jobs/a         | /jobs     | a    |     | disk    |
+| /jobs/a/v001    | /jobs/a   | v001 |     | version |
+| /jobs/a/a.ma    | /jobs/a   | a.ma | .ma | disk    |
+|____________________________________________________|
+
+Names are additionally broken up into trigrams, as in :mod:`lib.index`,
+such that a search reads only the entries sharing every trigram of
+the query rather than every entry. Searches use a connection of their
+own, and never wait on the crawler committing its writes.
+
+Usage:
+    >>> index = Index(':memory:')
+    >>> index.crawl('/jobs')
+    >>> index.wait()
+    >>> index.search('a.ma')
+
+"""
+
+# standard library
+import os
+import sqlite3
+import logging
+import threading
+
+# pifou library
+import pifou.domain.version
+
+# local library
+import lib.pool
+import lib.index
+import lib.model
+import lib.listing
+
+log = logging.getLogger('lib.search')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entry (
+    path TEXT NOT NULL,
+    directory TEXT NOT NULL,
+    name TEXT NOT NULL,
+    ext TEXT NOT NULL,
+    type TEXT NOT NULL,
+    isdir INTEGER NOT NULL,
+    PRIMARY KEY (path, type)
+);
+CREATE INDEX IF NOT EXISTS entry_directory ON entry (directory);
+CREATE INDEX IF NOT EXISTS entry_ext ON entry (ext);
+CREATE TABLE IF NOT EXISTS directory (
+    path TEXT PRIMARY KEY,
+    mtime REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS trigram (
+    trigram TEXT NOT NULL,
+    entry INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS trigram_trigram ON trigram (trigram);
+CREATE INDEX IF NOT EXISTS trigram_entry ON trigram (entry);
+"""
+
+# Indexes of older versions are crawled anew
+VERSION_SCHEMA = 1
+
+DISK = 'disk'
+VERSION = 'version'
+
+
+class Index(object):
+    """Searchable paths, crawled in the background
+
+    Arguments:
+        path (str): Absolute path to database, created if missing
+        workers (int): Maximum directories listed at once
+
+    """
+
+    def __init__(self, path, workers=4):
+        dirname = os.path.dirname(path)
+        if dirname and not os.path.exists(dirname):
+            os.makedirs(dirname)
+
+        self.path = path
+        self.workers = workers
+        self.pool = None
+
+        # Entries are written from crawling threads
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+
+        version, = self.connection.execute("PRAGMA user_version").fetchone()
+        if version < VERSION_SCHEMA:
+            for table in ('entry', 'directory', 'trigram'):
+                self.connection.execute("DROP TABLE IF EXISTS %s" % table)
+            self.connection.execute(
+                "PRAGMA user_version = %i" % VERSION_SCHEMA)
+
+        self.connection.executescript(SCHEMA)
+
+        # Searched from a separate, read-only connection; with a
+        # write-ahead log, reads see the last commit of the crawler
+        # without waiting on the next. In-memory databases are not
+        # shared between connections.
+        self.reader = None
+        if path != ':memory:':
+            self.connection.execute("PRAGMA journal_mode = WAL")
+            self.reader = sqlite3.connect(path)
+            self.reader.execute("PRAGMA query_only = 1")
+
+    def crawl(self, root):
+        """Index `root` and everything beneath it, in the background"""
+        if self.pool is None:
+            self.pool = lib.pool.Pool(self.workers, name='index')
+
+        self.pool.submit(self.visit, root)
+
+    def wait(self):
+        """Block until every crawl has finished"""
+        if self.pool is not None:
+            self.pool.queue.join()
+
+    def visit(self, directory):
+        """Index `directory` and schedule a visit of each subdirectory"""
+        try:
+            mtime = os.stat(directory).st_mtime
+        except OSError:
+            return
+
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT mtime FROM directory WHERE path = ?",
+                (directory,)).fetchone()
+
+            if row is not None and row[0] == mtime:
+                subdirectories = [path for path, in self.connection.execute(
+                    "SELECT path FROM entry "
+                    "WHERE directory = ? AND type = ? AND isdir = 1",
+                    (directory, DISK))]
+            else:
+                subdirectories = None
+
+        if subdirectories is None:
+            try:
+                subdirectories = self.update(directory, mtime)
+            except OSError:
+                return
+
+        for subdirectory in subdirectories:
+            self.pool.submit(self.visit, subdirectory)
+
+    def update(self, directory, mtime):
+        """Replace indexed entries of modified `directory`
+
+        Returns:
+            Absolute paths of subdirectories
+
+        Raises:
+            OSError if `directory` could not be listed
+
+        """
+
+        # Names hidden from the browser are not found either
+        entries = [entry for entry in lib.listing.ls(directory)
+                   if lib.model.included(entry.name)]
+
+        rows = list()
+        for entry in entries:
+            rows.append((entry.path,
+                         directory,
+                         entry.name,
+                         extension(entry),
+                         DISK,
+                         entry.isdir))
+
+        for version in pifou.domain.version.ls(directory):
+            rows.append((os.path.join(directory, version),
+                         directory,
+                         version,
+                         '',
+                         VERSION,
+                         True))
+
+        subdirectories = [entry.path for entry in entries if entry.isdir]
+
+        with self.lock:
+            previous = set(path for path, in self.connection.execute(
+                "SELECT path FROM entry "
+                "WHERE directory = ? AND type = ? AND isdir = 1",
+                (directory, DISK)))
+
+            # Forget everything beneath removed subdirectories
+            for removed in previous - set(subdirectories):
+                self._delete_tree(removed)
+
+            self.connection.execute(
+                "DELETE FROM trigram WHERE entry IN "
+                "(SELECT rowid FROM entry WHERE directory = ?)",
+                (directory,))
+            self.connection.execute(
+                "DELETE FROM entry WHERE directory = ?", (directory,))
+
+            trigrams = list()
+            for row in rows:
+                rowid = self.connection.execute(
+                    "INSERT OR REPLACE INTO entry VALUES (?, ?, ?, ?, ?, ?)",
+                    row).lastrowid
+                trigrams.extend((trigram, rowid)
+                                for trigram in lib.index.split(row[2].lower()))
+
+            self.connection.executemany(
+                "INSERT INTO trigram VALUES (?, ?)", trigrams)
+            self.connection.execute(
+                "INSERT OR REPLACE INTO directory VALUES (?, ?)",
+                (directory, mtime))
+            self.connection.commit()
+
+        log.debug("Indexed %s" % directory)
+
+        return subdirectories
+
+    def search(self, query, ext=None, limit=100):
+        """Return indexed entries whose name contains `query`
+
+        Queries of at least three characters are looked up by trigram,
+        shorter queries are matched against every name.
+
+        Arguments:
+            query (str): Case-insensitive substring of name
+            ext (str): Only return files of this extension, e.g. '.ma'
+            limit (int): Maximum number of results
+
+        Returns:
+            list of (path, type) tuples, shortest path first
+
+        """
+
+        pattern = '%' + escape(query) + '%'
+        sql = "SELECT path, type FROM entry WHERE name LIKE ? ESCAPE '\\'"
+        arguments = [pattern]
+
+        trigrams = sorted(lib.index.split(query.lower()))
+        if trigrams:
+            sql += (" AND rowid IN (%s)" % " INTERSECT ".join(
+                ["SELECT entry FROM trigram WHERE trigram = ?"] *
+                len(trigrams)))
+            arguments.extend(trigrams)
+
+        if ext is not None:
+            sql += " AND ext = ?"
+            arguments.append(ext.lower())
+
+        sql += " ORDER BY length(path) LIMIT ?"
+        arguments.append(limit)
+
+        if self.reader is not None:
+            return self.reader.execute(sql, arguments).fetchall()
+
+        with self.lock:
+            return self.connection.execute(sql, arguments).fetchall()
+
+    def close(self):
+        if self.reader is not None:
+            self.reader.close()
+
+        with self.lock:
+            self.connection.close()
+
+    def _delete_tree(self, directory):
+        pattern = escape(directory + os.sep) + '%'
+
+        self.connection.execute(
+            "DELETE FROM trigram WHERE entry IN "
+            "(SELECT rowid FROM entry WHERE directory = ? OR "
+            "directory LIKE ? ESCAPE '\\')", (directory, pattern))
+
+        for table, column in (('entry', 'directory'),
+                              ('directory', 'path')):
+            self.connection.execute(
+                "DELETE FROM %s WHERE %s = ? OR %s LIKE ? ESCAPE '\\'"
+                % (table, column, column), (directory, pattern))
+
+
+def extension(entry):
+    if entry.isdir:
+        return ''
+    return os.path.splitext(entry.name)[1].lower()
+
+
+def escape(string):
+    """Escape wildcards of LIKE patterns"""
+    return (string.replace('\\', '\\\\')
+                  .replace('%', '\\%')
+                  .replace('_', '\\_'))
@@ -0,0 +1,114 @@
+"""Tabs and bookmarks, kept between sessions
+
+Each tab and bookmark holds a snapshot of the model, see
+:meth:`lib.model.Model.snapshot`, such that it is restored as it
+was left, rather than pulled anew from the root.
+
+Sessions are written by a background thread; the most recent of
+saves made whilst writing is written next, and the others skipped.
+
+ ______________________________________________
+|                                              |
+| roots:     ["/jobs"]                         |
+| tabs:      [{name, snapshot}, ..]            |
+| current:   0                                 |
+| bookmarks: [{name, path, snapshot}, ..]      |
+|______________________________________________|
+
+"""
+
+# standard library
+import os
+import json
+import logging
+import threading
+
+log = logging.getLogger('lib.session')
+
+
+class Session(object):
+    """Tabs and bookmarks, stored as JSON at `path`
+
+    Arguments:
+        path (str): Absolute path to file, created when saved
+
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.roots = list()
+        self.tabs = list()
+        self.current = 0
+        self.bookmarks = list()
+
+        self.lock = threading.Lock()
+        self.pending = None  # Serialised session, awaiting write
+        self.writer = None  # Thread writing pending sessions
+
+        self.load()
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except (IOError, ValueError) as e:
+            log.warning("Could not read session %s: %s" % (self.path, e))
+            return
+
+        self.roots = data.get('roots', list())
+        self.tabs = data.get('tabs', list())
+        self.current = data.get('current', 0)
+        self.bookmarks = data.get('bookmarks', list())
+
+    def save(self):
+        """Write session to disk, in the background"""
+        data = json.dumps({'roots': self.roots,
+                           'tabs': self.tabs,
+                           'current': self.current,
+                           'bookmarks': self.bookmarks})
+
+        with self.lock:
+            self.pending = data
+
+            if self.writer is None:
+                # Not a daemon, such that a save upon exit completes
+                self.writer = threading.Thread(target=self.write,
+                                               name='session_writer')
+                self.writer.start()
+
+    def write(self):
+        while True:
+            with self.lock:
+                data, self.pending = self.pending, None
+                if data is None:
+                    self.writer = None
+                    return
+
+            # Written in full before being renamed into place,
+            # such that a session is never left half-written.
+            temp = self.path + '.tmp'
+            try:
+                dirname = os.path.dirname(self.path)
+                if dirname and not os.path.exists(dirname):
+                    os.makedirs(dirname)
+
+                with open(temp, 'w') as f:
+                    f.write(data)
+
+                if os.path.exists(self.path):
+                    os.remove(self.path)  # Windows does not replace
+                os.rename(temp, self.path)
+
+            except (IOError, OSError) as e:
+                log.warning("Could not write session %s: %s"
+                            % (self.path, e))
+
+    def clear(self, roots):
+        """Forget tabs and bookmarks, of roots other than `roots`"""
+        self.roots = list(roots)
+        self.tabs = list()
+        self.current = 0
+        self.bookmarks = list()
@@ -1,5 +1,31 @@
+import os
+
 WINDOW_SIZE = (700, 700)  # w/h
 WINDOW_POSITION = None
 WINDOW_MINIMUM_SIZE = (400, 300)
 MARGIN = 7  # px
 SPACING = 5  # px
+
+# Persistent directory listing cache
+CACHE_PATH = os.path.join(os.path.expanduser('~'), '.lib', 'listing.db')
+CACHE_SIZE = 64 * 1024 * 1024  # bytes
+
+# Persistent index of paths, searched from the search bar
+SEARCH_PATH = os.path.join(os.path.expanduser('~'), '.lib', 'search.db')
+SEARCH_WORKERS = 4
+
+# Outbound messages to the host; info messages are either
+# dropped or coalesced once the receiver falls behind
+OUTBOX_SIZE = 1000  # messages
+OUTBOX_HWM = 100  # messages
+OUTBOX_POLICY = 'coalesce'
+
+# Tabs and bookmarks, restored upon launch
+SESSION_PATH = os.path.join(os.path.expanduser('~'), '.lib', 'session.json')
+SESSION_DELAY = 5000  # ms, since last change, before being saved
+
+# Thumbnails, decoded in a pool of processes and cached on disk
+THUMBNAIL_PATH = os.path.join(os.path.expanduser('~'), '.lib', 'thumbnails')
+THUMBNAIL_SIZE = 32  # px
+THUMBNAIL_WORKERS = 2
+THUMBNAIL_MEMORY = 1000  # thumbnails
@@ -0,0 +1,99 @@
+"""Cold-start timings
+
+Startup is recorded in phases, each as the time since launch, under
+the 'startup.*' timers of :mod:`lib.stats`. Time spent importing each
+module may additionally be recorded, via :func:`profile_imports`,
+and is included in the :func:`report` logged once startup finishes.
+ ___________________________________________
+|                                           |
+| startup.imports        0.41s              |
+| startup.first_column   0.63s              |
+| startup.ready          1.12s              |
+|                                           |
+| PyQt5.QtWidgets        0.18s              |
+| pigui.pyqt5.model      0.09s              |
+| ..                                        |
+|___________________________________________|
+
+Usage:
+    >>> import lib.startup
+    >>> lib.startup.profile_imports()
+    >>> import lib.presentation
+    >>> lib.startup.mark('imports')
+
+"""
+
+# standard library
+import sys
+import time
+import logging
+import __builtin__
+
+# local library
+import lib.stats
+
+log = logging.getLogger('lib.startup')
+
+# Launch, or import of this module, whichever is known
+started = time.time()
+
+_imports = dict()  # {module: seconds, including nested imports}
+_import = __builtin__.__import__
+
+
+def mark(phase):
+    """Record time since launch, upon reaching `phase`"""
+    lib.stats.record('startup.%s' % phase, time.time() - started)
+
+
+def profile_imports():
+    """Record time spent on each subsequent first import of a module
+
+    Times include those of modules imported in turn, such that the
+    modules worth importing lazily are found at the top.
+
+    Submodules imported by name, e.g. QtWidgets of
+    "from PyQt5 import QtWidgets", are recorded under their full
+    name, e.g. "PyQt5.QtWidgets".
+
+    """
+
+    def profiled(name, globals=None, locals=None, fromlist=None, level=-1):
+        names = [name] + ['%s.%s' % (name, sub) for sub in fromlist or ()
+                          if sub != '*']
+        names = [full for full in names if full not in sys.modules]
+
+        if not names:
+            return _import(name, globals, locals, fromlist, level)
+
+        begun = time.time()
+        try:
+            return _import(name, globals, locals, fromlist, level)
+        finally:
+            duration = time.time() - begun
+
+            # Names of attributes, rather than modules, are skipped
+            names = [full for full in names if full in sys.modules]
+            key = ', '.join(names)
+
+            if names and key not in _imports:
+                _imports[key] = duration
+
+    __builtin__.__import__ = profiled
+
+
+def imports():
+    """Return (module, seconds) of profiled imports, slowest first"""
+    return sorted(_imports.items(), key=lambda item: -item[1])
+
+
+def report(limit=20):
+    """Log startup phases, and the `limit` slowest imports"""
+    timers = lib.stats.snapshot()['timers']
+
+    for name, timer in sorted(timers.items(), key=lambda i: i[1]['max']):
+        if name.startswith('startup.'):
+            log.info("%s: %.3fs" % (name, timer['max']))
+
+    for name, duration in imports()[:limit]:
+        log.info("import %s: %.3fs" % (name, duration))
@@ -0,0 +1,124 @@
+"""Named timers and counters of hot paths
+
+Timings and counts are accumulated per name, from any thread, and
+may be read as a whole via :func:`snapshot`; e.g. by the `stats`
+command of the command server, or periodically by a
+:class:`Reporter`.
+
+Usage:
+    >>> with timer('model.pull'):
+    ...     pass
+    >>> count('item.data.disk')
+    >>> snapshot()['counters']['item.data.disk']
+    1
+
+"""
+
+# standard library
+import json
+import time
+import logging
+import threading
+import contextlib
+
+log = logging.getLogger('lib.stats')
+
+_lock = threading.Lock()
+_timers = dict()  # {name: [count, total, max]}
+_counters = dict()  # {name: count}
+
+
+@contextlib.contextmanager
+def timer(name):
+    """Time the enclosed block under `name`"""
+    started = time.time()
+    try:
+        yield
+    finally:
+        record(name, time.time() - started)
+
+
+def record(name, duration):
+    """Add `duration`, in seconds, to timer `name`"""
+    with _lock:
+        stats = _timers.get(name)
+        if stats is None:
+            stats = _timers[name] = [0, 0.0, 0.0]
+
+        stats[0] += 1
+        stats[1] += duration
+        if duration > stats[2]:
+            stats[2] = duration
+
+
+def count(name, amount=1):
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + amount
+
+
+def snapshot():
+    """Return JSON-serialisable copy of every timer and counter
+
+    Timers are given as count, total, mean and max, in seconds.
+
+    """
+
+    with _lock:
+        timers = dict()
+        for name, (number, total, longest) in _timers.items():
+            timers[name] = {'count': number,
+                            'total': total,
+                            'mean': total / number,
+                            'max': longest}
+
+        return {'timers': timers,
+                'counters': dict(_counters)}
+
+
+def reset():
+    with _lock:
+        _timers.clear()
+        _counters.clear()
+
+
+class Reporter(object):
+    """Periodically log, or write as JSON, a :func:`snapshot`
+
+    Arguments:
+        interval (float): Seconds between reports
+        path (str): Write to this file, rather than log
+
+    """
+
+    def __init__(self, interval=60.0, path=None):
+        self.interval = interval
+        self.path = path
+        self.stopped = threading.Event()
+
+        thread = threading.Thread(target=self.thread,
+                                  name='stats_thread')
+        thread.daemon = True
+        thread.start()
+
+    def stop(self):
+        self.stopped.set()
+
+    def thread(self):
+        while not self.stopped.wait(self.interval):
+            self.report()
+
+    def report(self):
+        stats = snapshot()
+
+        if self.path is not None:
+            with open(self.path, 'w') as f:
+                json.dump(stats, f, indent=4, sort_keys=True)
+            return
+
+        for name, timer in sorted(stats['timers'].items()):
+            log.info("%s: %i in %.3fs (mean %.2fms, max %.2fms)"
+                     % (name, timer['count'], timer['total'],
+                        timer['mean'] * 1000, timer['max'] * 1000))
+
+        for name, number in sorted(stats['counters'].items()):
+            log.info("%s: %i" % (name, number))
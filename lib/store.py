@@ -0,0 +1,203 @@
+"""Columnar storage of item-data
+
+Rather than one dictionary per item, values are stored per key in
+parallel arrays, indexed by row.
+ ___________________________________________
+|     |      |        |      |       |       |
+| row | type | folder | name | group | mtime |
+|-----|------|--------|------|-------|-------|
+|  0  |  1   |   0    | a.ma |   0   | 13.0  |
+|  1  |  1   |   0    | b.ma |   0   | 14.0  |
+|  2  |  2   |   1    | v001 |   1   | 20.5  |
+|_____|______|________|______|_______|_______|
+
+Keys are declared up-front by kind.
+
+    codes: One of a small set of values, stored as a byte
+    strings: Interned strings, stored as an index into a table
+    numbers: Floats, stored as doubles
+    flags: Booleans, stored as a byte
+    paths: Absolute paths, stored as an interned directory
+        and a basename
+
+Values of undeclared keys are kept per row, in a dictionary.
+
+"""
+
+# standard library
+import os
+import array
+
+NONE = -1
+
+
+class Store(object):
+    """Item-data in parallel arrays
+
+    Arguments:
+        codes (dict): Key and tuple of possible values
+        strings (tuple): Keys of strings
+        numbers (tuple): Keys of numbers
+        flags (tuple): Keys of booleans
+        paths (tuple): Keys of absolute paths
+
+    """
+
+    def __init__(self,
+                 codes=None,
+                 strings=(),
+                 numbers=(),
+                 flags=(),
+                 paths=()):
+
+        self.codes = dict()  # {key: (values, {value: code})}
+        for key, values in (codes or dict()).items():
+            self.codes[key] = (values,
+                               dict((v, c) for c, v in enumerate(values)))
+
+        # Interned strings; 0 is reserved for None
+        self.table = [None]
+        self.interned = dict()
+
+        self.columns = dict()
+        for key in self.codes:
+            self.columns[key] = array.array('b')
+        for key in strings:
+            self.columns[key] = array.array('l')
+        for key in numbers:
+            self.columns[key] = array.array('d')
+        for key in flags:
+            self.columns[key] = array.array('b')
+
+        # Paths; {key: (directories, basenames)}
+        self.paths = dict()
+        for key in paths:
+            self.paths[key] = (array.array('l'), list())
+
+        self.strings = set(strings)
+        self.numbers = set(numbers)
+        self.flags = set(flags)
+
+        self.extra = dict()  # {row: {key: value}}
+        self.free = list()  # Released rows
+        self.rows = 0
+
+    def __len__(self):
+        return self.rows - len(self.free)
+
+    def add(self, data):
+        """Store `data` and return its row"""
+        if self.free:
+            row = self.free.pop()
+        else:
+            row = self.rows
+            self.rows += 1
+
+            for column in self.columns.values():
+                column.append(NONE if column.typecode != 'l' else 0)
+
+            for directories, basenames in self.paths.values():
+                directories.append(0)
+                basenames.append(None)
+
+        for key, value in data.items():
+            self.set(row, key, value)
+
+        return row
+
+    def release(self, row):
+        """Clear `row` for re-use"""
+        for column in self.columns.values():
+            column[row] = NONE if column.typecode != 'l' else 0
+
+        for directories, basenames in self.paths.values():
+            directories[row] = 0
+            basenames[row] = None
+
+        self.extra.pop(row, None)
+        self.free.append(row)
+
+    def get(self, row, key, default=None):
+        if key in self.paths:
+            directories, basenames = self.paths[key]
+            if basenames[row] is not None:
+                return os.path.join(self.table[directories[row]],
+                                    basenames[row])
+
+        elif key in self.codes:
+            code = self.columns[key][row]
+            if code != NONE:
+                return self.codes[key][0][code]
+
+        elif key in self.strings:
+            value = self.table[self.columns[key][row]]
+            if value is not None:
+                return value
+
+        elif key in self.numbers:
+            value = self.columns[key][row]
+            if value != NONE:
+                return value
+
+        elif key in self.flags:
+            value = self.columns[key][row]
+            if value != NONE:
+                return bool(value)
+
+        # Undeclared keys, and values not fitting their column
+        return self.extra.get(row, dict()).get(key, default)
+
+    def set(self, row, key, value):
+        extra = self.extra.get(row)
+        if extra is not None:
+            extra.pop(key, None)
+            if not extra:
+                del self.extra[row]
+
+        if key in self.paths:
+            directories, basenames = self.paths[key]
+            directories[row], basenames[row] = 0, None
+
+            if value is not None:
+                directory, basename = os.path.split(value)
+                directories[row] = self.intern(directory)
+                basenames[row] = basename
+                return
+
+        elif key in self.codes:
+            values, codes = self.codes[key]
+            self.columns[key][row] = codes.get(value, NONE)
+            if value in codes:
+                return
+
+        elif key in self.strings:
+            self.columns[key][row] = 0
+            if isinstance(value, basestring):
+                self.columns[key][row] = self.intern(value)
+                return
+
+        elif key in self.numbers:
+            self.columns[key][row] = NONE
+            if isinstance(value, (int, long, float)) and value != NONE:
+                self.columns[key][row] = value
+                return
+
+        elif key in self.flags:
+            self.columns[key][row] = NONE
+            if isinstance(value, bool):
+                self.columns[key][row] = 1 if value else 0
+                return
+
+        if value is not None:
+            self.extra.setdefault(row, dict())[key] = value
+
+    def intern(self, string):
+        if string is None:
+            return 0
+
+        try:
+            return self.interned[string]
+        except KeyError:
+            self.table.append(string)
+            self.interned[string] = len(self.table) - 1
+            return self.interned[string]
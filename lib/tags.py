@@ -0,0 +1,199 @@
+"""Tags and categories, stored in a sidecar database per root
+
+Metadata is stored per directory and basename, such that that of
+every item within a column is read at once.
+ ___________________________________
+|                                   |
+| directory | name     | tag        |
+|-----------|----------|------------|
+| a         | hero.ma  | approved   |
+| a         | hero.ma  | character  |
+|___________________________________|
+ ___________________________________
+|                                   |
+| directory | name     | category   |
+|-----------|----------|------------|
+| a         | hero.ma  | rig        |
+|___________________________________|
+
+Directories are stored relative to their root, separated by "/",
+such that metadata survives the root being mounted elsewhere, and
+items of merged roots share metadata by relative path.
+
+Writes are queued and committed together, in a single transaction,
+once `delay` has passed since the first of them; or upon the next
+read, such that reads always include prior writes.
+
+"""
+
+# standard library
+import os
+import sqlite3
+import logging
+import threading
+
+log = logging.getLogger('lib.tags')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tag (
+    directory TEXT NOT NULL,
+    name TEXT NOT NULL,
+    tag TEXT NOT NULL,
+    PRIMARY KEY (directory, name, tag)
+);
+CREATE TABLE IF NOT EXISTS category (
+    directory TEXT NOT NULL,
+    name TEXT NOT NULL,
+    category TEXT NOT NULL,
+    PRIMARY KEY (directory, name)
+);
+"""
+
+# Name of database, relative to root
+SIDECAR = '.lib.db'
+
+
+class Tags(object):
+    """Tags and categories of the items beneath `root`
+
+    Arguments:
+        root (str): Absolute path to library root; metadata is
+            stored alongside, in SIDECAR
+        roots (list): Every root merged with `root`, if any; paths
+            are stored relative to whichever root they are in
+        delay (float): Seconds during which writes are collected
+            before being committed
+
+    """
+
+    def __init__(self, root, roots=None, delay=1.0):
+        self.path = os.path.join(root, SIDECAR)
+        self.roots = [os.path.normpath(other) for other in roots or [root]]
+        self.delay = delay
+
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(self.path,
+                                          check_same_thread=False)
+        self.connection.executescript(SCHEMA)
+
+        self.pending = list()  # [(sql, arguments), ..]
+        self.timer = None
+
+        self.migrate()
+
+    def migrate(self):
+        """Store absolute directories, of prior versions, as relative"""
+        with self.lock:
+            for table in ('tag', 'category'):
+                directories = [row[0] for row in self.connection.execute(
+                    "SELECT DISTINCT directory FROM %s" % table)
+                    if os.path.isabs(row[0])]
+
+                for directory in directories:
+                    relative = self.relative(directory)
+                    if relative != directory:
+                        self.connection.execute(
+                            "UPDATE OR IGNORE %s SET directory = ? "
+                            "WHERE directory = ?" % table,
+                            (relative, directory))
+
+            self.connection.commit()
+
+    def relative(self, directory):
+        """Return `directory` relative to its root, or as-is if none"""
+        directory = os.path.normpath(directory)
+
+        for root in self.roots:
+            if (directory + os.sep).startswith(root + os.sep):
+                return os.path.relpath(directory, root).replace(os.sep, '/')
+
+        return directory
+
+    def split(self, path):
+        """Return (relative directory, name) of `path`"""
+        directory, name = os.path.split(os.path.normpath(path))
+        return self.relative(directory), name
+
+    def column(self, directory):
+        """Return metadata of every item in `directory`
+
+        Returns:
+            {name: (tags, category)}, of items with any metadata
+
+        """
+
+        self.flush()
+
+        directory = self.relative(directory)
+        metadata = dict()
+
+        with self.lock:
+            for name, tag in self.connection.execute(
+                    "SELECT name, tag FROM tag WHERE directory = ? "
+                    "ORDER BY tag", (directory,)):
+                metadata.setdefault(name, [list(), None])[0].append(tag)
+
+            for name, category in self.connection.execute(
+                    "SELECT name, category FROM category "
+                    "WHERE directory = ?", (directory,)):
+                metadata.setdefault(name, [list(), None])[1] = category
+
+        return dict((name, (tuple(tags), category))
+                    for name, (tags, category) in metadata.items())
+
+    def tag(self, paths, tag):
+        """Tag each of `paths` with `tag`"""
+        self.write("INSERT OR IGNORE INTO tag VALUES (?, ?, ?)",
+                   [self.split(path) + (tag,) for path in paths])
+
+    def untag(self, paths, tag):
+        self.write("DELETE FROM tag "
+                   "WHERE directory = ? AND name = ? AND tag = ?",
+                   [self.split(path) + (tag,) for path in paths])
+
+    def categorize(self, paths, category):
+        """Place each of `paths` in `category`, or none if None"""
+        if category is None:
+            self.write("DELETE FROM category "
+                       "WHERE directory = ? AND name = ?",
+                       [self.split(path) for path in paths])
+        else:
+            self.write("INSERT OR REPLACE INTO category VALUES (?, ?, ?)",
+                       [self.split(path) + (category,) for path in paths])
+
+    def write(self, sql, arguments):
+        """Queue `sql` to be executed per item in `arguments`"""
+        with self.lock:
+            self.pending.append((sql, arguments))
+
+            if self.timer is None:
+                self.timer = threading.Timer(self.delay, self.flush)
+                self.timer.daemon = True
+                self.timer.start()
+
+    def flush(self):
+        """Commit queued writes, in a single transaction"""
+        with self.lock:
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+
+            if not self.pending:
+                return
+
+            pending, self.pending = self.pending, list()
+
+            count = 0
+            for sql, arguments in pending:
+                self.connection.executemany(sql, arguments)
+                count += len(arguments)
+
+            self.connection.commit()
+
+        log.debug("Wrote metadata of %i items" % count)
+
+    def close(self):
+        self.flush()
+
+        with self.lock:
+            self.connection.close()
@@ -0,0 +1,244 @@
+"""Thumbnails of images, and of files with a preview sidecar
+
+Thumbnails are decoded and scaled in a pool of processes, away from
+the GUI thread, and stored once in a content-addressed cache on disk;
+the most recently displayed are additionally kept in memory.
+ ____________        _________        ______________
+|            |      |         |      |              |
+| request -->|----->| pending |----->| process pool |
+|____________|      |_________|      |______________|
+      ^                  |                  |
+      |               cancel                v
+ _____|______                        ______________
+|            |                      |              |
+| memory LRU |<---------------------| disk cache   |
+|____________|                      |______________|
+
+Requests not yet handed to the pool may be cancelled, e.g. as their
+row scrolls out of view; at most two per process are handed out at
+any one time, such that few requests are left running needlessly.
+
+A file is represented by itself, if an image, or otherwise by a
+sidecar of the same name, e.g. "asset.ma.png" or "asset.png". A
+version is represented by its "preview" or "thumbnail" image.
+
+"""
+
+# standard library
+import os
+import logging
+import hashlib
+import collections
+import multiprocessing
+
+# pifou dependencies
+from PyQt5 import QtGui
+from PyQt5 import QtCore
+
+# local library
+import lib.stats
+
+log = logging.getLogger('lib.thumbnail')
+
+IMAGES = ('.png', '.jpg', '.jpeg', '.bmp', '.gif', '.tif', '.tiff')
+PREVIEWS = ('preview', 'thumbnail')
+
+
+def source(path):
+    """Return path to image representing `path`, or None
+
+    Arguments:
+        path (str): Absolute path to file or version
+
+    """
+
+    if os.path.isdir(path):
+        candidates = [os.path.join(path, name + ext)
+                      for name in PREVIEWS
+                      for ext in IMAGES]
+
+    elif os.path.splitext(path)[1].lower() in IMAGES:
+        return path
+
+    else:
+        base = os.path.splitext(path)[0]
+        candidates = [path + ext for ext in IMAGES]
+        candidates += [base + ext for ext in IMAGES]
+
+    for candidate in candidates:
+        if os.path.isfile(candidate):
+            return candidate
+
+    return None
+
+
+def digest(path, size):
+    """Return address of the thumbnail of image at `path`
+
+    The address changes along with the image and the thumbnail
+    `size`, such that a cached thumbnail is never stale.
+
+    """
+
+    st = os.stat(path)
+    key = '%s|%r|%i|%i' % (path, st.st_mtime, st.st_size, size)
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+
+def render(path, cache, size):
+    """Return path to cached thumbnail of `path`, or None
+
+    Called in a worker process; the thumbnail is decoded, scaled
+    and written to `cache` unless it is already there.
+
+    Arguments:
+        path (str): Absolute path to file or version
+        cache (str): Absolute path to directory of thumbnails
+        size (int): Maximum width and height, in pixels
+
+    """
+
+    try:
+        image_path = source(path)
+        if image_path is None:
+            return None
+
+        address = digest(image_path, size)
+        target = os.path.join(cache, address[:2], address + '.png')
+
+        if os.path.exists(target):
+            return target
+
+        image = QtGui.QImage(image_path)
+        if image.isNull():
+            return None
+
+        image = image.scaled(size, size,
+                             QtCore.Qt.KeepAspectRatio,
+                             QtCore.Qt.SmoothTransformation)
+
+        dirname = os.path.dirname(target)
+        if not os.path.exists(dirname):
+            try:
+                os.makedirs(dirname)
+            except OSError:
+                pass  # Made by another process
+
+        # Written in full before being renamed into place,
+        # such that other processes never read a partial file.
+        temp = '%s.%i' % (target, os.getpid())
+        if not image.save(temp, 'PNG'):
+            return None
+
+        os.rename(temp, target)
+        return target
+
+    except Exception:
+        # Exceptions would otherwise leave the request unanswered
+        return None
+
+
+class Thumbnails(QtCore.QObject):
+    """Thumbnails, decoded in a process pool and cached on disk
+
+    The pool is started immediately, and should be constructed
+    before the QApplication, such that its processes are not
+    forked from a process already running Qt.
+
+    Arguments:
+        path (str): Absolute path to directory of cached thumbnails
+        size (int): Maximum width and height, in pixels
+        workers (int): Number of processes
+        memory (int): Maximum thumbnails kept in memory
+
+    Signals:
+        ready (tuple, QPixmap): Thumbnail of key is available,
+            pixmap is None if the key has no thumbnail
+
+    """
+
+    ready = QtCore.pyqtSignal(object, object)
+
+    # Emitted from the thread receiving results from the pool
+    rendered = QtCore.pyqtSignal(object, object)
+
+    def __init__(self, path, size=32, workers=2, memory=1000):
+        super(Thumbnails, self).__init__()
+
+        self.path = path
+        self.size = size
+        self.workers = workers
+        self.memory = memory
+
+        self.pool = multiprocessing.Pool(workers)
+        self.pending = collections.OrderedDict()  # {key: path}
+        self.running = set()  # Keys handed to the pool
+        self.pixmaps = collections.OrderedDict()  # {key: QPixmap or None}
+
+        self.rendered.connect(self.on_rendered)
+
+    def request(self, key):
+        """Request thumbnail of `key`
+
+        Arguments:
+            key (tuple): Path, mtime and size of file or version
+
+        Returns:
+            (bool, QPixmap): Whether the thumbnail is known, and
+                if so, its pixmap, or None if `key` has no thumbnail.
+                Otherwise, :attr:`ready` is emitted once known.
+
+        """
+
+        if key in self.pixmaps:
+            pixmap = self.pixmaps.pop(key)
+            self.pixmaps[key] = pixmap
+            return True, pixmap
+
+        if key not in self.running:
+            lib.stats.count('thumbnail.requested')
+            self.pending[key] = key[0]
+            self.submit()
+
+        return False, None
+
+    def cancel(self, key):
+        """Forget request of `key`, unless already being rendered"""
+        if self.pending.pop(key, None) is not None:
+            lib.stats.count('thumbnail.cancelled')
+
+    def submit(self):
+        """Hand pending requests to the pool, most recent first"""
+        if self.pool is None:
+            return  # Closed
+
+        while self.pending and len(self.running) < self.workers * 2:
+            key, path = self.pending.popitem()
+            self.running.add(key)
+
+            self.pool.apply_async(
+                render, (path, self.path, self.size),
+                callback=lambda target, key=key:
+                    self.rendered.emit(key, target))
+
+    def on_rendered(self, key, target):
+        self.running.discard(key)
+
+        pixmap = None
+        if target is not None:
+            pixmap = QtGui.QPixmap(target)
+            if pixmap.isNull():
+                log.warning("Could not read thumbnail %s" % target)
+                pixmap = None
+
+        self.pixmaps[key] = pixmap
+        while len(self.pixmaps) > self.memory:
+            self.pixmaps.popitem(last=False)
+
+        self.ready.emit(key, pixmap)
+        self.submit()
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool = None
@@ -1,35 +1,362 @@
+"""Views of the model
+
+Columns may optionally be virtualised; rather than one delegate per
+index, only the rows within the viewport are represented, by delegates
+recycled from a pool as they scroll out of view.
+ ______________
+|              |
+|  (scrolled)  |    Rows outside of the viewport
+|______________|    have no delegate
+|              |
+| delegate  0  |
+| delegate  1  |    Delegates are re-bound to whichever
+| delegate  2  |    rows are visible
+|______________|
+|              |
+|  (scrolled)  |
+|______________|
+
+Thumbnails, if enabled, are likewise requested for visible rows only,
+and requests are cancelled as their row scrolls out of view.
+
+"""
+
+# standard library
+import logging
+
+# pifou dependencies
+from PyQt5 import QtCore
+from PyQt5 import QtWidgets
+
+# local library
+import lib.model
+import lib.stats
 import lib.delegate
 
 import pigui.pyqt5.model
 import pigui.pyqt5.widgets.delegate
 import pigui.pyqt5.widgets.list.view
+import pigui.pyqt5.widgets.miller.view
 
 DefaultList = pigui.pyqt5.widgets.list.view.DefaultList
+DefaultMiller = pigui.pyqt5.widgets.miller.view.DefaultMiller
 
+log = logging.getLogger('lib.view')
 
-def create_delegate(self, index):
-    typ = self.model.data(index, 'type')
+
+def delegate_spec(model, index):
+    """Return class and label of delegate representing `index`
+
+    Returns:
+        (type, str) or None if `index` has no dashboard-specific delegate
+
+    """
+
+    command = lib.model.split_command(index)
+    if command is not None:
+        parent, label = command
+        return lib.delegate.CommandDelegate, label
+
+    typ = model.data(index, 'type')
+    label = model.data(index, 'display')
 
     if typ == 'disk':
-        label = self.model.data(index, 'display')
-        if self.model.data(index, key='group'):
-            return lib.delegate.FolderDelegate(label, index)
+        if model.data(index, key='group'):
+            return lib.delegate.FolderDelegate, label
         else:
-            return lib.delegate.FileDelegate(label, index)
+            return lib.delegate.FileDelegate, label
 
     elif typ == 'version':
-        label = self.model.data(index, 'display')
-        return lib.delegate.VersionDelegate(label, index)
+        return lib.delegate.VersionDelegate, label
 
-    elif typ == 'command':
-        label = self.model.data(index, 'command')
-        return pigui.pyqt5.widgets.delegate.CommandDelegate(label, index)
+    elif typ == 'loading':
+        return lib.delegate.LoadingDelegate, label
 
-    else:
+    return None
+
+
+def thumbnail_key(model, index):
+    """Return key of thumbnail of `index`, or None if it has none
+
+    Files and versions have thumbnails, see :mod:`lib.thumbnail`.
+
+    """
+
+    typ = model.data(index, 'type')
+    if typ == 'disk' and model.data(index, key='group'):
+        return None
+
+    if typ not in ('disk', 'version'):
+        return None
+
+    return (model.data(index, 'path'),
+            model.data(index, 'mtime'),
+            model.data(index, 'size'))
+
+
+def create_delegate(self, index):
+    spec = delegate_spec(self.model, index)
+    if spec is None:
         return super(DefaultList, self).create_delegate(index)
 
+    cls, label = spec
+
+    with lib.stats.timer('view.create_delegate'):
+        delegate = cls(label, index)
+
+    if isinstance(delegate, lib.delegate.FolderDelegate):
+        delegate.hovered.connect(self.model.prefetch)
+
+    return delegate
+
+
+class VirtualList(QtWidgets.QAbstractScrollArea):
+    """Column instantiating delegates for visible rows only
+
+    Delegates are kept in a pool per class and re-bound to another
+    index as they scroll out of view, such that the cost of opening
+    or scrolling a column is independent of its number of rows.
+
+    Rows are re-read as the model announces changes to the children
+    of the represented index, e.g. as batches of a background pull
+    arrive, see :attr:`lib.model.Model.pulled`.
+
+    Arguments:
+        parent (QtWidgets.QWidget): Qt parent of this widget
+
+    """
+
+    row_height = 20
+    thumbnails = None  # lib.thumbnail.Thumbnails, see enable_thumbnails
+
+    def __init__(self, parent=None):
+        super(VirtualList, self).__init__(parent)
+        self.setHorizontalScrollBarPolicy(QtCore.Qt.ScrollBarAlwaysOff)
+        self.verticalScrollBar().valueChanged.connect(self.layout_rows)
+
+        self.model = None
+        self.index = None
+        self.rows = list()  # Indexes, in order of appearance
+
+        self.visible = dict()  # {row: delegate}
+        self.pool = dict()  # {class: [delegate]}
+        self.checked = set()  # Indexes of checked rows
+        self.requested = dict()  # {thumbnail key: row}
+
+        if self.thumbnails is not None:
+            self.thumbnails.ready.connect(self.on_thumbnail)
+
+    def set_model(self, model):
+        if self.model is not None:
+            self.model.pulled.disconnect(self.on_pulled)
+            self.model.model_reset.disconnect(self.on_model_reset)
+
+        self.model = model
+
+        if model is not None:
+            model.pulled.connect(self.on_pulled)
+            model.model_reset.connect(self.on_model_reset)
+
+    def on_pulled(self, index):
+        if index == self.index:
+            self.refresh()
+
+    def on_model_reset(self):
+        if self.index not in self.model.indexes:
+            self.index = None
+            self.checked.clear()
+        self.refresh()
+
+    def set_index(self, index):
+        """Represent children of `index`"""
+        self.index = index
+        self.checked.clear()
+        self.refresh()
+
+    def refresh(self):
+        """Re-read rows from model and re-bind visible delegates"""
+        for row in self.visible.keys():
+            self.recycle(row)
+
+        self.rows = list()
+        if self.model is not None and self.index is not None:
+            self.rows = list(self.model.children(self.index))
+
+        scrollbar = self.verticalScrollBar()
+        scrollbar.setSingleStep(self.row_height)
+        scrollbar.setPageStep(self.viewport().height())
+        scrollbar.setRange(0, max(0, len(self.rows) * self.row_height -
+                                  self.viewport().height()))
+
+        self.layout_rows()
+
+    def layout_rows(self, *args):
+        """Bind delegates to rows within the viewport, and only those"""
+        offset = self.verticalScrollBar().value()
+        height = self.viewport().height()
+        width = self.viewport().width()
+
+        first = offset // self.row_height
+        last = min(len(self.rows), (offset + height) // self.row_height + 1)
+
+        for row in self.visible.keys():
+            if not first <= row < last:
+                self.recycle(row)
+
+        for row in range(first, last):
+            delegate = self.visible.get(row)
+            if delegate is None:
+                delegate = self.acquire(self.rows[row])
+                self.visible[row] = delegate
+                self.request_thumbnail(row, delegate)
+
+            delegate.setGeometry(0, row * self.row_height - offset,
+                                 width, self.row_height)
+            delegate.show()
+
+    def acquire(self, index):
+        """Return delegate bound to `index`, re-using pooled delegates"""
+        spec = delegate_spec(self.model, index)
+        if spec is None:
+            cls = pigui.pyqt5.widgets.delegate.FileDelegate
+            label = self.model.data(index, 'display')
+        else:
+            cls, label = spec
+
+        checked = index in self.checked
+
+        pooled = self.pool.get(cls)
+        if pooled:
+            delegate = pooled.pop()
+
+            if isinstance(delegate, lib.delegate.Recyclable):
+                delegate.bind(label, index, checked)
+                lib.stats.count('view.recycle_delegate')
+                return delegate
+
+        with lib.stats.timer('view.create_delegate'):
+            delegate = cls(label, index)
+        delegate.setParent(self.viewport())
+        delegate.setChecked(checked)
+
+        if isinstance(delegate, lib.delegate.FolderDelegate):
+            delegate.hovered.connect(self.model.prefetch)
+
+        return delegate
+
+    def request_thumbnail(self, row, delegate):
+        if (self.thumbnails is None or
+                not isinstance(delegate, lib.delegate.Previewable)):
+            return
+
+        key = thumbnail_key(self.model, delegate.index)
+        if key is None:
+            return
+
+        known, pixmap = self.thumbnails.request(key)
+        if known:
+            delegate.set_thumbnail(pixmap)
+        else:
+            self.requested[key] = row
+
+    def on_thumbnail(self, key, pixmap):
+        row = self.requested.pop(key, None)
+        delegate = self.visible.get(row)
+        if delegate is not None and pixmap is not None:
+            delegate.set_thumbnail(pixmap)
+
+    def recycle(self, row):
+        """Return delegate of `row` to the pool"""
+        delegate = self.visible.pop(row)
+        delegate.hide()
+
+        if self.thumbnails is not None:
+            key = thumbnail_key(self.model, delegate.index)
+            if self.requested.get(key) == row:
+                del self.requested[key]
+                self.thumbnails.cancel(key)
+
+        if delegate.isChecked():
+            self.checked.add(delegate.index)
+        else:
+            self.checked.discard(delegate.index)
+
+        if isinstance(delegate, lib.delegate.Recyclable):
+            self.pool.setdefault(type(delegate), list()).append(delegate)
+        else:
+            delegate.deleteLater()
+
+    def resizeEvent(self, event):
+        super(VirtualList, self).resizeEvent(event)
+        self.refresh()
+
+
+def expand(model, index):
+    """Open columns leading up to, and including, `index`
+
+    Miller views open a column per pulled index; each ancestor of
+    `index` not already expanded is pulled, root first, followed by
+    `index` itself if a directory. Ancestors created by
+    :meth:`lib.model.Model.reveal` are completed, not duplicated.
+
+    Arguments:
+        model (lib.model.Model): Model holding `index`
+        index (str): Index to navigate to
+
+    """
+
+    item = model.indexes[index]
+
+    ancestors = list()
+    while item is not None:
+        ancestors.insert(0, item.index)
+        item = item.parent
+
+    for ancestor in ancestors:
+        if ancestor == index and not model.data(index, 'group'):
+            break
+
+        if ancestor not in model.expanded:
+            model.pull(ancestor)
+
 
 def monkey_patch():
     """The alteration is minimal enough for
     a monkey-patch to suffice"""
     DefaultList.create_delegate = create_delegate
+
+
+def enable_virtual():
+    """Use virtualised columns in subsequently created Miller views
+
+    Note:
+        Miller views create their columns from `list_class`, where
+        available; otherwise columns are left as they are.
+
+    Returns:
+        bool: Whether columns are virtualised
+
+    """
+
+    if not hasattr(DefaultMiller, 'list_class'):
+        log.warning("Virtual columns not supported by this "
+                    "version of pigui")
+        return False
+
+    DefaultMiller.list_class = VirtualList
+    return True
+
+
+def enable_thumbnails(thumbnails):
+    """Display thumbnails in virtualised columns
+
+    Rows are made tall enough to fit a thumbnail.
+
+    Arguments:
+        thumbnails (lib.thumbnail.Thumbnails): Source of thumbnails
+
+    """
+
+    VirtualList.thumbnails = thumbnails
+    VirtualList.row_height = max(VirtualList.row_height,
+                                 thumbnails.size + 4)
@@ -0,0 +1,336 @@
+"""Watch directories for added, removed and renamed entries
+
+Changes are coalesced per directory over a debounce window and
+delivered as a single :class:`Change`, naming which entries are
+dirty rather than what happened to them; the receiver compares
+each dirty name against what is on disk at the time of delivery.
+
+ _________        __________        __________
+|         |      |          |      |          |
+| inotify |----->|          |      |          |
+|_________|      | debounce |----->| callback |
+|         |      |          |      |__________|
+| polling |----->|          |
+|_________|      |__________|
+
+Usage:
+    >>> watcher = create(callback=lambda change: None)
+    >>> watcher.watch('/jobs')
+    >>> watcher.stop()
+
+"""
+
+# standard library
+import os
+import time
+import logging
+import threading
+import collections
+
+# local library
+import lib.listing
+
+try:
+    import pyinotify
+except ImportError:
+    pyinotify = None
+
+log = logging.getLogger('lib.watcher')
+
+
+class Change(collections.namedtuple('Change', ['directory',
+                                                'names',
+                                                'renames'])):
+    """Coalesced modifications to `directory`
+
+    Attributes:
+        directory (str): Absolute path to watched directory
+        names (set): Basenames of added, removed or modified entries
+        renames (list): Pairs of (old, new) basenames
+
+    """
+
+    __slots__ = ()
+
+
+def create(callback, debounce=0.5, interval=2.0):
+    """Return the best available watcher
+
+    Arguments:
+        callback (func): Called with a :class:`Change`, from a
+            background thread
+        debounce (float): Seconds without changes after which
+            changes are delivered
+        interval (float): Seconds between polls, if polling
+
+    """
+
+    if pyinotify is not None:
+        return InotifyWatcher(callback, debounce)
+
+    log.info("pyinotify not available, polling for changes")
+    return PollingWatcher(callback, debounce, interval)
+
+
+class Debouncer(object):
+    """Merge changes per directory until `delay` has passed in quiet"""
+
+    def __init__(self, callback, delay):
+        self.callback = callback
+        self.delay = delay
+
+        self.pending = dict()  # {directory: (names, renames)}
+        self.last = dict()  # {directory: time of last change}
+        self.condition = threading.Condition()
+
+        thread = threading.Thread(target=self.thread,
+                                  name='debounce_thread')
+        thread.daemon = True
+        thread.start()
+
+    def add(self, directory, names=(), renames=()):
+        with self.condition:
+            pending_names, pending_renames = self.pending.setdefault(
+                directory, (set(), list()))
+
+            pending_names.update(names)
+            pending_renames.extend(renames)
+
+            self.last[directory] = time.time()
+            self.condition.notify()
+
+    def discard(self, directory):
+        with self.condition:
+            self.pending.pop(directory, None)
+            self.last.pop(directory, None)
+
+    def thread(self):
+        while True:
+            with self.condition:
+                while not self.pending:
+                    self.condition.wait()
+
+                now = time.time()
+                due = [directory for directory, last in self.last.items()
+                       if now - last >= self.delay]
+
+                if not due:
+                    self.condition.wait(self.delay)
+                    continue
+
+                changes = list()
+                for directory in due:
+                    names, renames = self.pending.pop(directory)
+                    self.last.pop(directory)
+                    changes.append(Change(directory, names, renames))
+
+            for change in changes:
+                try:
+                    self.callback(change)
+                except Exception:
+                    log.exception("Failed to deliver %r" % (change,))
+
+
+class PollingWatcher(object):
+    """Detect changes by comparing listings of modified directories
+
+    Renames are detected by inode, where the platform provides one.
+
+    """
+
+    def __init__(self, callback, debounce=0.5, interval=2.0):
+        self.debouncer = Debouncer(callback, debounce)
+        self.interval = interval
+
+        # {directory: (mtime, {name: Entry})}, None until first polled
+        self.snapshots = dict()
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+
+        thread = threading.Thread(target=self.thread,
+                                  name='poll_thread')
+        thread.daemon = True
+        thread.start()
+
+    def watch(self, directory):
+        """Watch `directory`, from the next poll onwards"""
+        with self.lock:
+            self.snapshots.setdefault(directory, None)
+
+    def unwatch(self, directory):
+        with self.lock:
+            self.snapshots.pop(directory, None)
+        self.debouncer.discard(directory)
+
+    def watching(self):
+        with self.lock:
+            return list(self.snapshots)
+
+    def stop(self):
+        self.stopped.set()
+
+    def snapshot(self, directory):
+        try:
+            mtime = os.stat(directory).st_mtime
+            entries = lib.listing.ls(directory)
+        except OSError:
+            return None
+
+        return mtime, dict((entry.name, entry) for entry in entries)
+
+    def thread(self):
+        while not self.stopped.wait(self.interval):
+            for directory in self.watching():
+                try:
+                    mtime = os.stat(directory).st_mtime
+                except OSError:
+                    continue
+
+                with self.lock:
+                    previous = self.snapshots.get(directory)
+
+                if previous is None:
+                    snapshot = self.snapshot(directory)
+                    with self.lock:
+                        if directory in self.snapshots:
+                            self.snapshots[directory] = snapshot
+                    continue
+
+                # Contents of directories may change without altering
+                # its mtime, but additions, removals and renames do not.
+                if previous[0] == mtime:
+                    continue
+
+                current = self.snapshot(directory)
+                if current is None:
+                    continue
+
+                with self.lock:
+                    if directory not in self.snapshots:
+                        continue  # Unwatched whilst listing
+                    self.snapshots[directory] = current
+
+                names, renames = self.compare(previous[1], current[1])
+                if names or renames:
+                    self.debouncer.add(directory, names, renames)
+
+    def compare(self, before, after):
+        names = set()
+
+        removed = set(before) - set(after)
+        added = set(after) - set(before)
+        for name in set(before) & set(after):
+            if before[name] != after[name]:
+                names.add(name)
+
+        # Inodes are 0 on platforms without them
+        renames = list()
+        by_inode = dict((after[name].inode, name) for name in added)
+        for name in removed:
+            inode = before[name].inode
+            if inode and inode in by_inode:
+                renames.append((name, by_inode.pop(inode)))
+
+        names.update(removed, added)
+        return names, renames
+
+
+if pyinotify is not None:
+    class _Handler(pyinotify.ProcessEvent):
+        """Forward inotify events to :class:`InotifyWatcher`"""
+
+        def my_init(self, watcher):
+            self.watcher = watcher
+
+        def process_default(self, event):
+            self.watcher.process(event)
+
+
+class InotifyWatcher(object):
+    """Receive changes from the Linux kernel via pyinotify
+
+    Renames are paired by the cookie shared between the
+    IN_MOVED_FROM and IN_MOVED_TO events.
+
+    """
+
+    mask = 0
+    if pyinotify is not None:
+        mask = (pyinotify.IN_CREATE |
+                pyinotify.IN_DELETE |
+                pyinotify.IN_MOVED_FROM |
+                pyinotify.IN_MOVED_TO |
+                pyinotify.IN_CLOSE_WRITE |
+                pyinotify.IN_ATTRIB)
+
+    def __init__(self, callback, debounce=0.5):
+        self.debouncer = Debouncer(callback, debounce)
+
+        self.descriptors = dict()  # {directory: watch descriptor}
+        self.moves = dict()  # {cookie: (directory, name)}
+        self.lock = threading.Lock()
+
+        self.manager = pyinotify.WatchManager()
+        self.notifier = pyinotify.ThreadedNotifier(
+            self.manager, _Handler(watcher=self))
+        self.notifier.daemon = True
+        self.notifier.start()
+
+    def watch(self, directory):
+        with self.lock:
+            if directory in self.descriptors:
+                return
+
+            result = self.manager.add_watch(directory, self.mask)
+            descriptor = result.get(directory, -1)
+
+            if descriptor < 0:
+                log.warning("Could not watch %s" % directory)
+                return
+
+            self.descriptors[directory] = descriptor
+
+    def unwatch(self, directory):
+        with self.lock:
+            descriptor = self.descriptors.pop(directory, None)
+
+        if descriptor is not None:
+            self.manager.rm_watch(descriptor, quiet=True)
+
+        self.debouncer.discard(directory)
+
+    def watching(self):
+        with self.lock:
+            return list(self.descriptors)
+
+    def stop(self):
+        self.notifier.stop()
+
+    def process(self, event):
+        if not event.name or event.name.startswith('.'):
+            return
+
+        directory = event.path
+
+        if event.mask & pyinotify.IN_MOVED_FROM:
+            with self.lock:
+                # Entries moved out of watched directories are never
+                # paired, and are forgotten once plenty have piled up.
+                if len(self.moves) > 1024:
+                    self.moves.clear()
+                self.moves[event.cookie] = (directory, event.name)
+
+        elif event.mask & pyinotify.IN_MOVED_TO:
+            with self.lock:
+                origin = self.moves.pop(event.cookie, None)
+
+            if origin is not None and origin[0] == directory:
+                self.debouncer.add(directory,
+                                   names=(origin[1], event.name),
+                                   renames=[(origin[1], event.name)])
+                return
+
+            if origin is not None:
+                self.debouncer.add(origin[0], names=(origin[1],))
+
+        self.debouncer.add(directory, names=(event.name,))